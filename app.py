@@ -2,30 +2,19 @@ import streamlit as st
 from agentes_crew import AgentesDeContenido, TareasDeContenido
 # from crewai import Crew
 
+import html
 import requests
-from bs4 import BeautifulSoup
+from html_parsers import stream_extract
+from critical_css import build_bootstrap_assets
 
 def extraer_contenido_requests(url):
     try:
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-        partes = []
-        # Títulos principales
-        for tag in soup.select("h1, h2, h3"):
-            txt = tag.get_text(strip=True)
-            if txt:
-                partes.append(txt)
-        # Productos y descripciones
-        for card in soup.select(".caption"):
-            txt = card.get_text(separator=" ", strip=True)
-            if txt:
-                partes.append(txt)
-        # Precios
-        for price in soup.select(".price"):
-            txt = price.get_text(strip=True)
-            if txt:
-                partes.append(f"Precio: {txt}")
+        # Descarga en streaming: se deja de leer en cuanto se llena el presupuesto de texto
+        with requests.get(url, timeout=10, stream=True) as r:
+            r.raise_for_status()
+            # Solo se fuerza la codificación si el servidor la declara; si no, la detecta el parser
+            encoding = r.encoding if "charset" in r.headers.get("Content-Type", "").lower() else None
+            partes = stream_extract(r.iter_content(chunk_size=64 * 1024), max_chars=8000, encoding=encoding)
         texto = "\n".join(partes)
         return texto[:8000]
     except Exception as e:
@@ -91,19 +80,24 @@ if st.button("Procesar con IA"):
             except Exception as e:
                 # Fallback: muestra el body optimizado hasta donde se pudo
                 body_optimizado = texto_editable.strip() or "(Sin contenido procesado)"
+                cuerpo_html = f"""
+                    <div class='container mt-5'>
+                        <h2>Contenido optimizado hasta donde fue posible</h2>
+                        <pre>{body_optimizado}</pre>
+                    </div>
+                """
+                bootstrap_css, bootstrap_js = build_bootstrap_assets(cuerpo_html)
                 resultado_final = f"""
                 <!DOCTYPE html>
                 <html lang='es'>
                 <head>
                     <meta charset='UTF-8'>
                     <title>Página incompleta</title>
-                    <link href='https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css' rel='stylesheet'>
+                    {bootstrap_css}
                 </head>
                 <body>
-                    <div class='container mt-5'>
-                        <h2>Contenido optimizado hasta donde fue posible</h2>
-                        <pre>{body_optimizado}</pre>
-                    </div>
+                    {cuerpo_html}
+                    {bootstrap_js}
                 </body>
                 </html>
                 """
@@ -124,4 +118,4 @@ if st.button("Procesar con IA"):
             )
             
             st.subheader("👀 Vista Previa de la Página SEO Optimizada")
-            st.markdown(f'<iframe srcdoc="{resultado_final.replace("`", "")}" width="100%" height="600px"></iframe>', unsafe_allow_html=True)
\ No newline at end of file
+            st.markdown(f'<iframe srcdoc="{html.escape(resultado_final.replace("`", ""))}" width="100%" height="600px"></iframe>', unsafe_allow_html=True)
\ No newline at end of file
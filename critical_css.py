@@ -0,0 +1,205 @@
+"""
+Optimización de salida: CSS crítico de Bootstrap purgado e incrustado.
+
+En lugar de enlazar el CSS y el JS completos de Bootstrap desde el CDN,
+se parte de la copia versionada en vendor/, se conservan solo las reglas cuyos
+selectores usa el HTML generado y el resultado se incrusta en un <style>.
+El bundle JS solo se incluye si algún componente interactivo lo necesita.
+
+Para actualizar la copia local: python critical_css.py --vendor
+"""
+import base64
+import hashlib
+import os
+import re
+import sys
+from functools import lru_cache
+
+import requests
+
+BOOTSTRAP_VERSION = "5.3.3"
+VENDOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vendor", f"bootstrap-{BOOTSTRAP_VERSION}")
+BOOTSTRAP_CSS_PATH = os.path.join(VENDOR_DIR, "bootstrap.min.css")
+BOOTSTRAP_CSS_URL = f"https://cdn.jsdelivr.net/npm/bootstrap@{BOOTSTRAP_VERSION}/dist/css/bootstrap.min.css"
+BOOTSTRAP_CSS_INTEGRITY = "sha384-QWTKZyjpPEjISv5WaRU9OFeRpok6YctnYmDr5pNlyT2bRjXh0JMhjY6hW+ALEwIH"
+
+BOOTSTRAP_CSS_LINK = f'<link href="{BOOTSTRAP_CSS_URL}" rel="stylesheet" integrity="{BOOTSTRAP_CSS_INTEGRITY}" crossorigin="anonymous">'
+BOOTSTRAP_JS_SCRIPT = (
+    f'<script src="https://cdn.jsdelivr.net/npm/bootstrap@{BOOTSTRAP_VERSION}/dist/js/bootstrap.bundle.min.js" '
+    'integrity="sha384-YvpcrYf0tY3lHB60NNkmXc5s9fDVZLESaAA55NDzOxhy9GkcIdslK1eN7N6jIeHz" crossorigin="anonymous" defer></script>'
+)
+
+# Clases y atributos que indican un componente que depende del JS de Bootstrap
+INTERACTIVE_CLASSES = {"dropdown", "modal", "carousel", "collapse", "offcanvas", "toast", "accordion"}
+INTERACTIVE_ATTR_PATTERN = re.compile(r'data-bs-(?:toggle|ride|dismiss|target)\s*=')
+# Siempre presentes en la página aunque no aparezcan en el fragmento analizado
+BASE_TAGS = {"html", "head", "body"}
+
+def verify_integrity(data: bytes, integrity: str) -> bool:
+    """Comprueba un hash SRI del tipo 'sha384-<base64>'."""
+    algorithm, _, expected = integrity.partition("-")
+    digest = hashlib.new(algorithm, data).digest()
+    return base64.b64encode(digest).decode() == expected
+
+@lru_cache(maxsize=1)
+def load_vendored_bootstrap() -> str | None:
+    """
+    Devuelve el CSS de Bootstrap de la copia versionada en vendor/, o None si falta
+    o no supera la comprobación de integridad. Nunca descarga ni escribe nada, así
+    que es seguro llamarla a la vez desde varios procesos. Se cachea por proceso.
+    """
+    try:
+        with open(BOOTSTRAP_CSS_PATH, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        print(f"⚠️  No hay copia local de Bootstrap ({e}). Se enlazará el CSS del CDN.")
+        return None
+    if not verify_integrity(data, BOOTSTRAP_CSS_INTEGRITY):
+        print(f"❌ {BOOTSTRAP_CSS_PATH} no coincide con su hash de integridad. Se enlazará el CSS del CDN.")
+        return None
+    return data.decode("utf-8")
+
+def vendor_bootstrap() -> bool:
+    """
+    Descarga el CSS de Bootstrap del CDN a vendor/ tras verificar su hash SRI.
+    Se escribe en un archivo temporal y se renombra, para que nadie lea nunca una copia a medias.
+    """
+    try:
+        r = requests.get(BOOTSTRAP_CSS_URL, timeout=15)
+        r.raise_for_status()
+    except requests.RequestException as e:
+        print(f"❌ No se pudo descargar Bootstrap: {e}")
+        return False
+    if not verify_integrity(r.content, BOOTSTRAP_CSS_INTEGRITY):
+        print("❌ El CSS de Bootstrap descargado no coincide con su hash de integridad.")
+        return False
+    os.makedirs(VENDOR_DIR, exist_ok=True)
+    tmp_path = f"{BOOTSTRAP_CSS_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(r.content)
+    os.replace(tmp_path, BOOTSTRAP_CSS_PATH)
+    load_vendored_bootstrap.cache_clear()
+    print(f"📦 Bootstrap {BOOTSTRAP_VERSION} guardado en {BOOTSTRAP_CSS_PATH}")
+    return True
+
+def collect_used_selectors(html: str) -> tuple[set[str], set[str]]:
+    """Clases y etiquetas que aparecen en el HTML generado."""
+    classes = set()
+    for match in re.finditer(r'class\s*=\s*(["\'])(.*?)\1', html, re.DOTALL):
+        classes.update(match.group(2).split())
+    tags = {t.lower() for t in re.findall(r'<([a-zA-Z][a-zA-Z0-9]*)', html)} | BASE_TAGS
+    return classes, tags
+
+def needs_bootstrap_js(html: str) -> bool:
+    classes, _ = collect_used_selectors(html)
+    return bool(classes & INTERACTIVE_CLASSES) or bool(INTERACTIVE_ATTR_PATTERN.search(html))
+
+def _split_blocks(css: str) -> list[tuple[str, str | None]]:
+    """Divide el CSS en bloques de primer nivel (preludio, cuerpo). Las sentencias '@...;' no tienen cuerpo."""
+    blocks = []
+    i, n = 0, len(css)
+    while i < n:
+        brace = css.find('{', i)
+        if brace == -1:
+            break
+        semicolon = css.find(';', i)
+        if semicolon != -1 and semicolon < brace:
+            blocks.append((css[i:semicolon].strip(), None))
+            i = semicolon + 1
+            continue
+        depth, j = 1, brace + 1
+        while j < n and depth:
+            if css[j] == '{':
+                depth += 1
+            elif css[j] == '}':
+                depth -= 1
+            j += 1
+        blocks.append((css[i:brace].strip(), css[brace + 1:j - 1]))
+        i = j
+    return blocks
+
+def _split_selectors(prelude: str) -> list[str]:
+    """Separa una lista de selectores por comas, respetando paréntesis (:not(a, b))."""
+    selectors, depth, current = [], 0, ""
+    for char in prelude:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and depth == 0:
+            selectors.append(current.strip())
+            current = ""
+        else:
+            current += char
+    if current.strip():
+        selectors.append(current.strip())
+    return selectors
+
+def is_selector_used(selector: str, classes: set[str], tags: set[str]) -> bool:
+    """Un selector se conserva si todas sus clases y etiquetas aparecen en el HTML."""
+    # Las negaciones y los estados no restringen qué elementos existen
+    simple = re.sub(r':(?:not|is|where|has)\([^)]*\)', '', selector)
+    simple = re.sub(r'\[[^\]]*\]', '', simple)
+    simple = re.sub(r'::?[\w-]+(?:\([^)]*\))?', '', simple)
+
+    selector_classes = re.findall(r'\.((?:\\.|[\w-])+)', simple)
+    if any(cls.replace('\\', '') not in classes for cls in selector_classes):
+        return False
+    remaining = re.sub(r'[.#](?:\\.|[\w-])+', ' ', simple)
+    selector_tags = re.findall(r'[a-zA-Z][\w-]*', remaining)
+    return all(tag.lower() in tags for tag in selector_tags)
+
+def _purge_blocks(css: str, classes: set[str], tags: set[str], keyframes: list) -> str:
+    out = []
+    for prelude, body in _split_blocks(css):
+        if body is None:
+            continue
+        if prelude.startswith(('@media', '@supports', '@layer', '@container')):
+            inner = _purge_blocks(body, classes, tags, keyframes)
+            if inner:
+                out.append(f"{prelude}{{{inner}}}")
+        elif re.match(r'@(?:-webkit-)?keyframes', prelude):
+            keyframes.append((prelude.split()[-1], f"{prelude}{{{body}}}"))
+        elif prelude.startswith('@font-face'):
+            out.append(f"{prelude}{{{body}}}")
+        elif prelude.startswith('@'):
+            continue
+        else:
+            selectors = [s for s in _split_selectors(prelude) if is_selector_used(s, classes, tags)]
+            if selectors:
+                out.append(f"{','.join(selectors)}{{{body}}}")
+    return "".join(out)
+
+def purge_css(css: str, classes: set[str], tags: set[str]) -> str:
+    """
+    Elimina del stylesheet las reglas que no aplican a las clases/etiquetas usadas.
+    Los comentarios '/*! ... */' (licencia de Bootstrap) se conservan al principio.
+    """
+    banners = re.findall(r'/\*!.*?\*/', css, flags=re.DOTALL)
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    keyframes = []
+    purged = _purge_blocks(css, classes, tags, keyframes)
+    # Solo las animaciones referenciadas por alguna regla conservada
+    used_keyframes = [block for name, block in keyframes if re.search(rf'\b{re.escape(name)}\b', purged)]
+    return "".join(banners) + purged + "".join(used_keyframes)
+
+def build_bootstrap_assets(body_html: str) -> tuple[str, str]:
+    """
+    Devuelve el bloque para el <head> (CSS crítico incrustado, o el <link> al CDN si no
+    hay copia local) y el <script> de Bootstrap, vacío si la página no lo necesita.
+    """
+    css = load_vendored_bootstrap()
+    if css is None:
+        head_html = BOOTSTRAP_CSS_LINK
+    else:
+        classes, tags = collect_used_selectors(body_html)
+        critical_css = purge_css(css, classes, tags)
+        print(f"🎨 CSS crítico: {len(css) / 1024:.1f} KB -> {len(critical_css) / 1024:.1f} KB")
+        head_html = f"<style>{critical_css}</style>"
+    scripts_html = BOOTSTRAP_JS_SCRIPT if needs_bootstrap_js(body_html) else ""
+    return head_html, scripts_html
+
+if __name__ == "__main__":
+    if "--vendor" in sys.argv:
+        sys.exit(0 if vendor_bootstrap() else 1)
+    print("Uso: python critical_css.py --vendor")
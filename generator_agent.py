@@ -1,8 +1,20 @@
 import google.generativeai as genai
 import requests
-from bs4 import BeautifulSoup
+from html_parsers import make_soup
+from image_assets import optimize_blueprint_images
+from critical_css import build_bootstrap_assets, load_vendored_bootstrap
+from seo_memory import SEO_MEMORY_PATH, SeoRewriteMemory, iter_text_components, extract_rewrite, apply_rewrite
 import json
 import re
+import os
+import copy
+import sys
+import math
+from html import unescape
+import hashlib
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin, urlparse, urldefrag
 from datetime import datetime, timezone
 import uuid
 import time
@@ -97,12 +109,17 @@ def estimate_token_count(text):
 
 def truncate_content_smart(html_content, max_chars=20000):
     """
-    Trunca el contenido de manera inteligente manteniendo la estructura HTML
+    Trunca el contenido de manera inteligente manteniendo la estructura HTML.
+    Acepta el HTML como texto o un árbol ya parseado (así se evita volver a parsearlo).
     """
-    if len(html_content) <= max_chars:
-        return html_content
-    
-    soup = BeautifulSoup(html_content, 'html.parser')
+    if isinstance(html_content, str):
+        if len(html_content) <= max_chars:
+            return html_content
+        soup = make_soup(html_content)
+    else:
+        soup = html_content
+        if len(str(soup)) <= max_chars:
+            return str(soup)
     
     # Priorizar elementos por importancia
     priority_elements = []
@@ -183,8 +200,25 @@ def build_html_for_component(component: dict) -> str:
     elif component_type == "Image": 
         src = content.get('src', '') or layout_props.get('src', '')
         alt = content.get('alt', '') or layout_props.get('alt', '')
+        # Atributos añadidos por la etapa de optimización de imágenes (image_assets)
+        extra_attrs = ""
+        if content.get('width') and content.get('height'):
+            extra_attrs += f' width="{content["width"]}" height="{content["height"]}"'
+        if content.get('srcset'):
+            extra_attrs += f' srcset="{content["srcset"]}" sizes="{content.get("sizes", "100vw")}"'
+        if content.get('loading'):
+            extra_attrs += f' loading="{content["loading"]}"'
+        if content.get('fetchpriority'):
+            extra_attrs += f' fetchpriority="{content["fetchpriority"]}"'
         # Bootstrap: img-fluid, rounded, my-3
-        html = f'<img src="{src}" alt="{alt}" class="img-fluid rounded my-3">'
+        html = f'<img src="{src}" alt="{alt}"{extra_attrs} class="img-fluid rounded my-3">'
+        sources = content.get('sources') or []
+        if sources:
+            source_tags = "".join(
+                f'<source type="{source["type"]}" srcset="{source["srcset"]}" sizes="{content.get("sizes", "100vw")}">'
+                for source in sources
+            )
+            html = f"<picture>{source_tags}{html}</picture>"
     elif component_type == "Button": 
         url = content.get('url', '') or layout_props.get('url', '')
         text = content.get('text', '')
@@ -204,125 +238,301 @@ def build_html_for_component(component: dict) -> str:
         html = f"<div>{text}</div>"
     return minify_html(html)
 
+# ==============================================================================
+# SECCIÓN 1.5: PERFILES DE RENDERIZADO (SELENIUM)
+# ==============================================================================
+# Extensiones bloqueables agrupadas por tipo de recurso
+RESOURCE_TYPE_EXTENSIONS = {
+    "image": ["jpg", "jpeg", "png", "gif", "webp", "avif", "svg", "ico"],
+    "font": ["woff", "woff2", "ttf", "otf", "eot"],
+    "stylesheet": ["css"],
+    "media": ["mp4", "webm", "mp3", "m3u8"],
+}
+# Patrones para Network.setBlockedURLs (se comparan con la URL completa): anclados al final
+# de la ruta, con o sin query, para no bloquear hosts como www.giftshop.com o www.eotech.com
+RESOURCE_TYPE_PATTERNS = {
+    resource_type: [pattern for ext in extensions for pattern in (f"*.{ext}", f"*.{ext}?*")]
+    for resource_type, extensions in RESOURCE_TYPE_EXTENSIONS.items()
+}
+
+# Analítica, publicidad y widgets de chat de terceros: nunca aportan contenido
+THIRD_PARTY_BLOCK_PATTERNS = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*connect.facebook.net*", "*hotjar.com*",
+    "*clarity.ms*", "*intercom.io*", "*livechatinc.com*", "*zopim.com*",
+    "*zendesk.com*", "*tawk.to*", "*drift.com*", "*olark.com*", "*hs-scripts.com*",
+]
+
+RENDER_PROFILES = {
+    # Solo HTML + JS propio: lo mínimo para obtener el DOM final
+    "fast": {
+        "page_load_strategy": "eager",
+        "block_resource_types": ["image", "font", "stylesheet", "media"],
+        "block_third_party": True,
+        "stability_quiet_ms": 500,
+        "stability_timeout": 5,
+    },
+    # Mantiene CSS por si el sitio oculta/muestra contenido según estilos
+    "balanced": {
+        "page_load_strategy": "eager",
+        "block_resource_types": ["image", "font", "media"],
+        "block_third_party": True,
+        "stability_quiet_ms": 800,
+        "stability_timeout": 8,
+    },
+    # Carga completa, equivalente al comportamiento original
+    "full": {
+        "page_load_strategy": "normal",
+        "block_resource_types": [],
+        "block_third_party": False,
+        "stability_quiet_ms": 1000,
+        "stability_timeout": 10,
+    },
+}
+DEFAULT_RENDER_PROFILE = "balanced"
+
+# Perfil por sitio (host sin 'www.'), p. ej. {"legacychryslerjeepdodgeram.net": "fast"}
+SITE_RENDER_PROFILES = {}
+
+# Registra la última mutación del DOM y devuelve los ms transcurridos desde entonces
+RENDER_METRICS_FILENAME = "render_metrics.json"
+DOM_STABILITY_SCRIPT = """
+if (!window.__domStabilityObserver) {
+    window.__lastDomMutation = performance.now();
+    window.__domStabilityObserver = new MutationObserver(function () {
+        window.__lastDomMutation = performance.now();
+    });
+    // Sin 'attributes': animaciones y carruseles cambian style/class sin parar y nunca dejarían el DOM "quieto"
+    window.__domStabilityObserver.observe(document, {childList: true, subtree: true, characterData: true});
+}
+return performance.now() - window.__lastDomMutation;
+"""
+
+def get_render_profile(url: str, profile_name: str | None = None) -> str:
+    """Devuelve el nombre del perfil a usar: el explícito, el del sitio o el por defecto."""
+    if profile_name:
+        if profile_name not in RENDER_PROFILES:
+            raise ValueError(f"Perfil de renderizado desconocido: '{profile_name}'")
+        return profile_name
+    return SITE_RENDER_PROFILES.get(site_host(url), DEFAULT_RENDER_PROFILE)
+
+def wait_for_dom_stability(driver, quiet_ms: int, timeout: float) -> bool:
+    """Espera a que el DOM deje de cambiar durante `quiet_ms`, con un límite duro de `timeout` s."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if driver.execute_script(DOM_STABILITY_SCRIPT) >= quiet_ms:
+            return True
+        time.sleep(0.1)
+    return False
+
+def read_transferred_bytes(driver) -> tuple[int, int]:
+    """Suma los bytes recibidos por red según el log de rendimiento de Chrome (DevTools)."""
+    total_bytes = 0
+    requests_count = 0
+    for entry in driver.get_log("performance"):
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, json.JSONDecodeError):
+            continue
+        if message.get("method") == "Network.loadingFinished":
+            total_bytes += int(message["params"].get("encodedDataLength", 0))
+            requests_count += 1
+    return total_bytes, requests_count
+
+def summarize_render_metrics(metrics: list[dict]) -> dict:
+    """Agrupa las métricas por perfil: páginas, tiempo medio y KB medios transferidos."""
+    summary = {}
+    for profile_name in sorted({m["profile"] for m in metrics}):
+        rows = [m for m in metrics if m["profile"] == profile_name]
+        summary[profile_name] = {
+            "pages": len(rows),
+            "avg_render_seconds": round(sum(m["render_seconds"] for m in rows) / len(rows), 2),
+            "avg_kb_transferred": round(sum(m["bytes_transferred"] for m in rows) / len(rows) / 1024, 1),
+        }
+    for profile_name, row in summary.items():
+        print(f"⏱️  Perfil '{profile_name}': {row['pages']} páginas, {row['avg_render_seconds']} s y {row['avg_kb_transferred']} KB de media")
+    return summary
+
+def save_render_metrics(output_dir: str, metrics: list[dict]) -> dict:
+    """
+    Guarda las métricas en render_metrics.json agrupadas por perfil. Cada ejecución
+    reemplaza solo los perfiles que usó, así que se pueden comparar perfiles entre ejecuciones.
+    """
+    path = os.path.join(output_dir, RENDER_METRICS_FILENAME)
+    profiles = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                profiles = json.load(f).get("profiles", {})
+        except (OSError, json.JSONDecodeError, AttributeError):
+            profiles = {}
+    for profile_name in {m["profile"] for m in metrics}:
+        profiles[profile_name] = {
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+            "pages": [m for m in metrics if m["profile"] == profile_name],
+        }
+    all_pages = [m for entry in profiles.values() for m in entry["pages"]]
+    report = {"profiles": profiles, "summary": summarize_render_metrics(all_pages)}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
 # ==============================================================================
 # SECCIÓN 2: AGENTE MAPEADOR OPTIMIZADO (v3.0)
 # ==============================================================================
-def run_mapping_agent(url: str) -> dict | None:
-    if not model:
-        print("El modelo de IA no está configurado.")
-        return None
-        
-    print(f"🤖 Agente Mapeador (v3.0 Optimizado): Iniciando análisis -> {url}")
-    
+def create_chrome_driver(profile_name: str = DEFAULT_RENDER_PROFILE):
+    """Crea un driver de Chrome headless configurado según el perfil de renderizado."""
+    profile = RENDER_PROFILES[profile_name]
     chrome_options = Options()
     chrome_options.add_argument("--headless")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-images")  # No cargar imágenes para ser más rápido
-    chrome_options.add_argument("--disable-javascript")  # Opcional: deshabilitar JS si no es necesario
     chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
-    
+    if "image" in profile["block_resource_types"]:
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    # 'eager' devuelve el control en DOMContentLoaded, sin esperar imágenes ni iframes
+    chrome_options.page_load_strategy = profile["page_load_strategy"]
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
     service = Service()
-    driver = None
-    
-    try:
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        driver.set_page_load_timeout(30)
-        driver.get(url)
-        
-        # Esperar menos tiempo para ser más eficiente
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        time.sleep(2)
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    driver.set_page_load_timeout(30)
 
-        html_content = driver.page_source
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        print("🔍 Optimizador v3.0: Extrayendo y limpiando contenido relevante...")
-        
-        # Usar la nueva función de limpieza
-        main_content_soup = clean_and_extract_content(soup)
-        
-        if not main_content_soup:
-            print("Error: No se pudo extraer contenido de la página")
-            return None
-        
-        # Convertir a string y optimizar para la API
-        html_to_analyze = str(main_content_soup)
-        
-        # Truncar de manera inteligente si es muy largo
-        original_length = len(html_to_analyze)
-        html_to_analyze = truncate_content_smart(html_to_analyze, max_chars=15000)
-        
-        if len(html_to_analyze) < original_length:
-            print(f"📏 Contenido truncado de {original_length} a {len(html_to_analyze)} caracteres")
-        
-        estimated_tokens = estimate_token_count(html_to_analyze)
-        print(f"📊 Tokens estimados: {estimated_tokens}")
-        
-        if estimated_tokens > 8000:
-            print("⚠️  Advertencia: El contenido podría ser muy largo para la API gratuita")
-        
-        # Prompt optimizado y más específico
-        master_prompt = f"""
-Eres un experto analista de contenido web. Analiza SOLO el contenido principal de esta página web y extrae los elementos más importantes para SEO y experiencia de usuario.
+    # Los patrones se aplican en cada fetch_rendered_html, ya filtrados para la URL de la página
+    driver.execute_cdp_cmd("Network.enable", {})
+    return driver
 
-ENFÓCATE EN:
-1. Títulos principales (H1, H2, H3)
-2. Párrafos con contenido relevante y valioso
-3. Listas importantes
-4. Imágenes con alt text significativo
-5. Botones/enlaces de acción
+def blocked_url_patterns(profile_name: str) -> list[str]:
+    profile = RENDER_PROFILES[profile_name]
+    patterns = [pattern for resource_type in profile["block_resource_types"]
+                for pattern in RESOURCE_TYPE_PATTERNS[resource_type]]
+    if profile["block_third_party"]:
+        patterns += THIRD_PARTY_BLOCK_PATTERNS
+    return patterns
 
-IGNORA:
-- Navegación y menús
-- Footers y headers
-- Contenido duplicado o boilerplate
-- Elementos decorativos
+def url_matches_pattern(url: str, pattern: str) -> bool:
+    """Misma semántica que Network.setBlockedURLs: '*' es el único comodín."""
+    regex = ".*".join(re.escape(part) for part in pattern.split("*"))
+    return re.fullmatch(regex, url) is not None
+
+def page_blocked_url_patterns(url: str, profile_name: str) -> list[str]:
+    """Patrones del perfil sin los que bloquearían el propio documento (ERR_BLOCKED_BY_CLIENT)."""
+    return [pattern for pattern in blocked_url_patterns(profile_name) if not url_matches_pattern(url, pattern)]
+
+def fetch_rendered_html(driver, url: str, profile_name: str = DEFAULT_RENDER_PROFILE) -> tuple[str, dict]:
+    """Carga la URL en el driver y devuelve el HTML renderizado junto con sus métricas."""
+    profile = RENDER_PROFILES[profile_name]
+    read_transferred_bytes(driver)  # Vaciar el log de la página anterior
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": page_blocked_url_patterns(url, profile_name)})
+    start = time.perf_counter()
+    driver.get(url)
+
+    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+    dom_stable = wait_for_dom_stability(driver, profile["stability_quiet_ms"], profile["stability_timeout"])
 
+    html_content = driver.page_source
+    bytes_transferred, requests_count = read_transferred_bytes(driver)
+    metrics = {
+        "url": url,
+        "profile": profile_name,
+        "render_seconds": round(time.perf_counter() - start, 3),
+        "bytes_transferred": bytes_transferred,
+        "requests": requests_count,
+        "dom_stable": dom_stable,
+    }
+    print(f"⏱️  Renderizado '{profile_name}': {metrics['render_seconds']} s, "
+          f"{bytes_transferred / 1024:.1f} KB en {requests_count} peticiones")
+    return html_content, metrics
+
+def prepare_html_for_mapping(main_content_soup) -> str:
+    """Convierte el contenido principal limpio en el HTML (truncado) que se envía a la API."""
+    # Convertir a string y optimizar para la API
+    html_to_analyze = str(main_content_soup)
+
+    # Truncar de manera inteligente si es muy largo (reutilizando el árbol ya parseado)
+    original_length = len(html_to_analyze)
+    if original_length > 15000:
+        html_to_analyze = truncate_content_smart(main_content_soup, max_chars=15000)
+
+    if len(html_to_analyze) < original_length:
+        print(f"📏 Contenido truncado de {original_length} a {len(html_to_analyze)} caracteres")
+
+    estimated_tokens = estimate_token_count(html_to_analyze)
+    print(f"📊 Tokens estimados: {estimated_tokens}")
+
+    if estimated_tokens > 8000:
+        print("⚠️  Advertencia: El contenido podría ser muy largo para la API gratuita")
+
+    return html_to_analyze
+
+# Formato de cada tipo de componente, común a los prompts de mapeo
+COMPONENT_FORMATS_PROMPT = """
 ESTRUCTURA JSON OBLIGATORIA - SIGUE EXACTAMENTE ESTE FORMATO:
 
 Para Heading:
-{{
+{
     "id": "h1_1",
     "component_type": "Heading",
-    "content": {{
+    "content": {
         "text": "Texto del título",
         "level": 1
-    }},
-    "layout_properties": {{}}
-}}
+    },
+    "layout_properties": {}
+}
 
 Para Paragraph:
-{{
+{
     "id": "p_1",
     "component_type": "Paragraph",
-    "content": {{
+    "content": {
         "text": "Texto del párrafo"
-    }},
-    "layout_properties": {{}}
-}}
+    },
+    "layout_properties": {}
+}
 
 Para Button:
-{{
+{
     "id": "btn_1",
     "component_type": "Button",
-    "content": {{
+    "content": {
         "text": "Texto del botón",
         "url": "https://example.com"
-    }},
-    "layout_properties": {{}}
-}}
+    },
+    "layout_properties": {}
+}
 
 Para Image:
-{{
+{
     "id": "img_1",
     "component_type": "Image",
-    "content": {{
+    "content": {
         "src": "url_de_imagen",
         "alt": "texto_alternativo"
-    }},
-    "layout_properties": {{}}
-}}
+    },
+    "layout_properties": {}
+}
+"""
+
+def map_html_to_blueprint(html_to_analyze: str, url: str) -> dict | None:
+    """Envía el HTML ya limpio a Gemini y devuelve el blueprint JSON."""
+    # Prompt optimizado y más específico
+    master_prompt = f"""
+Eres un experto analista de contenido web. Analiza SOLO el contenido principal de esta página web y extrae los elementos más importantes para SEO y experiencia de usuario.
+
+ENFÓCATE EN:
+1. Títulos principales (H1, H2, H3)
+2. Párrafos con contenido relevante y valioso
+3. Listas importantes
+4. Imágenes con alt text significativo
+5. Botones/enlaces de acción
+
+IGNORA:
+- Navegación y menús
+- Footers y headers
+- Contenido duplicado o boilerplate
+- Elementos decorativos
+
+{COMPONENT_FORMATS_PROMPT.strip()}
 
 ESQUEMA FINAL:
 {{
@@ -339,43 +549,143 @@ HTML A ANALIZAR:
 
 IMPORTANTE: El campo "content" SIEMPRE debe ser un objeto {{}}, NUNCA un string directo.
 Responde ÚNICAMENTE con el JSON válido."""
-        
-        generation_config = genai.GenerationConfig(
-            max_output_tokens=8192,
-            temperature=0.1,
-            top_p=0.8
-        )
-        
-        print("🤖 Enviando contenido optimizado a Gemini...")
-        response_llm = model.generate_content(master_prompt, generation_config=generation_config)
 
-        if not response_llm or not response_llm.text:
-            print("Error: El modelo no devolvió respuesta")
-            return None
+    return request_blueprint(master_prompt)
 
-        json_text = response_llm.text.strip()
-        
-        # Limpiar la respuesta
-        if '```json' in json_text:
-            json_text = json_text.split('```json', 1)[1].rsplit('```', 1)[0]
-        json_text = json_text.strip()
+def map_site_components(shared_blocks: dict, url: str, max_chars: int = 15000) -> dict:
+    """
+    Mapea los bloques compartidos del sitio (datos del concesionario, avisos legales...).
+    Usa un prompt propio: el de las páginas pide ignorar justo este contenido. Cada
+    componente lleva en 'block_id' la huella de su bloque; los bloques que la IA no
+    convierta (o que no quepan en el prompt) se conservan tal cual como CustomHTML.
+    """
+    short_ids = {f"b{i + 1}": fp for i, fp in enumerate(shared_blocks)}
+    blocks_html, length = [], 0
+    for short_id, fp in short_ids.items():
+        block_html = f'<div data-block="{short_id}">{shared_blocks[fp]}</div>'
+        if length + len(block_html) > max_chars:
+            break
+        blocks_html.append(block_html)
+        length += len(block_html)
 
+    components = []
+    if blocks_html:
+        master_prompt = f"""
+Eres un experto analista de contenido web. Los siguientes bloques se repiten en casi todas las páginas
+de un sitio (datos de contacto, avisos legales, promociones comunes...). Se publicarán como una sección
+compartida del sitio, así que conviértelos TODOS en componentes: no omitas ningún bloque ni ningún dato
+(direcciones, teléfonos, horarios, condiciones legales).
+
+Cada bloque está envuelto en <div data-block="...">. Añade a cada componente el campo "block_id" con el
+valor del atributo data-block del bloque del que procede.
+
+{COMPONENT_FORMATS_PROMPT.strip()}
+
+ESQUEMA FINAL:
+{{
+    "schema_version": "1.1",
+    "source_url": "{url}",
+    "analysis_timestamp": "{datetime.now(timezone.utc).isoformat()}",
+    "main_content_blueprint": [
+        // Array de componentes siguiendo los formatos de arriba, cada uno con "block_id"
+    ]
+}}
+
+BLOQUES COMPARTIDOS:
+{''.join(blocks_html)}
+
+IMPORTANTE: El campo "content" SIEMPRE debe ser un objeto {{}}, NUNCA un string directo.
+Responde ÚNICAMENTE con el JSON válido."""
         try:
-            blueprint = json.loads(json_text)
-            
-            # Validar que el blueprint tenga contenido
-            if not blueprint.get('main_content_blueprint'):
-                print("⚠️  Advertencia: Blueprint vacío o sin contenido principal")
-                return None
-                
-            print(f"✅ Blueprint generado con {len(blueprint['main_content_blueprint'])} componentes")
-            return blueprint
-            
-        except json.JSONDecodeError as e:
-            print(f"Error JSON: {e}")
-            print("Respuesta recibida (primeros 500 chars):")
-            print(response_llm.text[:500])
+            blueprint = request_blueprint(master_prompt)
+        except Exception as e:
+            print(f"❌ Error al mapear los componentes del sitio: {e}")
+            blueprint = None
+        for component in (blueprint or {}).get('main_content_blueprint', []):
+            if isinstance(component, dict) and component.get('block_id') in short_ids:
+                component['block_id'] = short_ids[component['block_id']]
+                components.append(component)
+
+    # Ningún bloque compartido puede perderse: ya se eliminó de todas las páginas
+    mapped = {c['block_id'] for c in components}
+    for short_id, fp in short_ids.items():
+        if fp not in mapped:
+            components.append({"id": f"shared_{short_id}", "component_type": "CustomHTML", "block_id": fp,
+                               "content": {"html_code": shared_blocks[fp]}, "layout_properties": {}})
+    if len(mapped) < len(short_ids):
+        print(f"⚠️  {len(short_ids) - len(mapped)} bloques compartidos se conservan como CustomHTML")
+    return {
+        "schema_version": "1.1",
+        "source_url": url,
+        "analysis_timestamp": datetime.now(timezone.utc).isoformat(),
+        "main_content_blueprint": components,
+    }
+
+def request_blueprint(master_prompt: str) -> dict | None:
+    """Envía un prompt de mapeo a Gemini y valida el blueprint JSON devuelto."""
+    generation_config = genai.GenerationConfig(
+        max_output_tokens=8192,
+        temperature=0.1,
+        top_p=0.8
+    )
+
+    print("🤖 Enviando contenido optimizado a Gemini...")
+    response_llm = model.generate_content(master_prompt, generation_config=generation_config)
+
+    if not response_llm or not response_llm.text:
+        print("Error: El modelo no devolvió respuesta")
+        return None
+
+    json_text = response_llm.text.strip()
+
+    # Limpiar la respuesta
+    if '```json' in json_text:
+        json_text = json_text.split('```json', 1)[1].rsplit('```', 1)[0]
+    json_text = json_text.strip()
+
+    try:
+        blueprint = json.loads(json_text)
+
+        # Validar que el blueprint tenga contenido
+        if not blueprint.get('main_content_blueprint'):
+            print("⚠️  Advertencia: Blueprint vacío o sin contenido principal")
             return None
+
+        print(f"✅ Blueprint generado con {len(blueprint['main_content_blueprint'])} componentes")
+        return blueprint
+
+    except json.JSONDecodeError as e:
+        print(f"Error JSON: {e}")
+        print("Respuesta recibida (primeros 500 chars):")
+        print(response_llm.text[:500])
+        return None
+
+def run_mapping_agent(url: str, render_profile: str | None = None) -> dict | None:
+    if not model:
+        print("El modelo de IA no está configurado.")
+        return None
+        
+    print(f"🤖 Agente Mapeador (v3.0 Optimizado): Iniciando análisis -> {url}")
+    
+    driver = None
+    
+    try:
+        profile_name = get_render_profile(url, render_profile)
+        driver = create_chrome_driver(profile_name)
+        html_content, _ = fetch_rendered_html(driver, url, profile_name)
+        soup = make_soup(html_content)
+        
+        print("🔍 Optimizador v3.0: Extrayendo y limpiando contenido relevante...")
+        
+        # Usar la nueva función de limpieza
+        main_content_soup = clean_and_extract_content(soup)
+        
+        if not main_content_soup:
+            print("Error: No se pudo extraer contenido de la página")
+            return None
+        
+        html_to_analyze = prepare_html_for_mapping(main_content_soup)
+        return map_html_to_blueprint(html_to_analyze, url)
             
     except Exception as e:
         print(f"Error durante el análisis: {e}")
@@ -384,12 +694,256 @@ Responde ÚNICAMENTE con el JSON válido."""
         if driver:
             driver.quit()
 
+# ==============================================================================
+# SECCIÓN 2.2: MODO SITIO (DESCUBRIMIENTO DE URLS Y BOILERPLATE ENTRE PÁGINAS)
+# ==============================================================================
+SITE_MAX_PAGES = 50
+SITE_MAX_DEPTH = 2
+# Un bloque se considera boilerplate si aparece en al menos este % de páginas
+BOILERPLATE_MIN_RATIO = 0.6
+BOILERPLATE_MIN_PAGES = 3
+BOILERPLATE_MIN_TEXT = 40
+BOILERPLATE_BLOCK_TAGS = ['section', 'div', 'aside', 'p', 'ul', 'ol', 'form', 'table', 'figure', 'blockquote']
+NON_HTML_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.pdf', '.zip', '.css', '.js', '.xml', '.mp4')
+# Únicos códigos que indican que una URL ya no existe (el resto deja el descubrimiento incompleto)
+GONE_STATUS_CODES = (404, 410)
+
+def site_host(url: str) -> str:
+    """Host normalizado (sin 'www.') para limitar el rastreo a un solo sitio."""
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+def url_to_slug(url: str) -> str:
+    """Convierte la ruta de una URL en un nombre de archivo seguro."""
+    path = urlparse(url).path.strip('/')
+    slug = re.sub(r'[^a-zA-Z0-9]+', '-', path).strip('-').lower()
+    return slug or 'index'
+
+def fetch_sitemap_urls(start_url: str, max_pages: int = SITE_MAX_PAGES) -> tuple[list[str], bool]:
+    """
+    Lee sitemap.xml (y los sitemaps declarados en robots.txt), siguiendo
+    índices de sitemaps anidados. Devuelve las URLs del mismo host y si la
+    lectura fue completa (ningún sitemap declarado falló y no se llegó al límite).
+    """
+    parsed = urlparse(start_url)
+    base = f"{parsed.scheme}://{parsed.netloc}"
+    host = site_host(start_url)
+
+    default_sitemap = f"{base}/sitemap.xml"
+    sitemaps = deque([default_sitemap])
+    failed = False
+    try:
+        robots = requests.get(f"{base}/robots.txt", timeout=10)
+        if robots.ok:
+            sitemaps.extend(re.findall(r'(?im)^\s*sitemap:\s*(\S+)', robots.text))
+    except requests.RequestException:
+        pass
+
+    seen_sitemaps = set()
+    urls = []
+    while sitemaps and len(urls) < max_pages:
+        sitemap_url = sitemaps.popleft()
+        if sitemap_url in seen_sitemaps:
+            continue
+        seen_sitemaps.add(sitemap_url)
+        try:
+            r = requests.get(sitemap_url, timeout=10)
+            r.raise_for_status()
+        except requests.RequestException as e:
+            # Que /sitemap.xml no exista (404/410) es normal; cualquier otro fallo deja la lista incompleta
+            status = e.response.status_code if e.response is not None else None
+            failed = failed or sitemap_url != default_sitemap or status not in GONE_STATUS_CODES
+            continue
+
+        locs = [unescape(loc.strip()) for loc in re.findall(r'<loc>(.*?)</loc>', r.text, re.IGNORECASE | re.DOTALL)]
+        if '<sitemapindex' in r.text.lower():
+            sitemaps.extend(locs)
+            continue
+        for loc in locs:
+            if site_host(loc) == host and loc not in urls:
+                urls.append(loc)
+                if len(urls) >= max_pages:
+                    break
+    return urls, not failed and len(urls) < max_pages
+
+def crawl_site_urls(start_url: str, max_pages: int = SITE_MAX_PAGES, max_depth: int = SITE_MAX_DEPTH) -> tuple[list[str], bool]:
+    """
+    Rastreo en anchura desde la URL semilla, limitado por profundidad y host.
+    Devuelve las URLs y si el rastreo fue completo (sin errores de red ni límite alcanzado).
+    """
+    host = site_host(start_url)
+    queue = deque([(urldefrag(start_url)[0], 0)])
+    seen = {urldefrag(start_url)[0]}
+    urls = []
+    failed = False
+
+    while queue and len(urls) < max_pages:
+        url, depth = queue.popleft()
+        try:
+            r = requests.get(url, timeout=10)
+            if not r.ok:
+                # Solo 404/410 significan que la página ya no existe; un 403 de un WAF o un 429
+                # de rate limiting dejan el rastreo incompleto
+                if r.status_code not in GONE_STATUS_CODES:
+                    print(f"⚠️  No se pudo rastrear {url}: HTTP {r.status_code}")
+                    failed = True
+                continue
+            if 'text/html' not in r.headers.get('Content-Type', ''):
+                continue
+        except requests.RequestException as e:
+            print(f"⚠️  No se pudo rastrear {url}: {e}")
+            failed = True
+            continue
+
+        urls.append(url)
+        if depth >= max_depth:
+            continue
+
+        soup = make_soup(r.content)
+        for link in soup.find_all('a', href=True):
+            next_url = urldefrag(urljoin(url, link['href']))[0]
+            if not next_url.startswith(('http://', 'https://')):
+                continue
+            if site_host(next_url) != host or next_url.lower().endswith(NON_HTML_EXTENSIONS):
+                continue
+            if next_url not in seen:
+                seen.add(next_url)
+                queue.append((next_url, depth + 1))
+    return urls, not failed and not queue and len(urls) < max_pages
+
+def discover_site_urls(start_url: str, max_pages: int = SITE_MAX_PAGES,
+                       max_depth: int = SITE_MAX_DEPTH) -> tuple[list[str], bool]:
+    """
+    Descubre las URLs del sitio: primero sitemap.xml, si no existe, rastreo semilla.
+    El segundo valor indica si el descubrimiento es completo: solo entonces es seguro
+    dar por eliminada una página que ya no aparece.
+    """
+    print(f"🗺️  Descubriendo páginas del sitio -> {start_url}")
+    urls, complete = fetch_sitemap_urls(start_url, max_pages)
+    if urls:
+        print(f"✅ Sitemap encontrado con {len(urls)} URLs")
+    else:
+        print("⚠️  Sin sitemap utilizable. Rastreando enlaces internos...")
+        # Si el sitemap existe pero falló (403, 429...), el rastreo puede no cubrir todo lo que listaba
+        urls, crawl_complete = crawl_site_urls(start_url, max_pages, max_depth)
+        complete = complete and crawl_complete
+        print(f"✅ Rastreo completado con {len(urls)} URLs")
+    if not urls:
+        complete = False
+
+    if start_url not in urls:
+        if len(urls) >= max_pages:
+            complete = False
+        urls = [start_url] + urls[:max_pages - 1]
+    if not complete:
+        print("⚠️  Descubrimiento parcial (errores de red o límite de páginas alcanzado)")
+    return urls, complete
+
+def fingerprint_block(tag) -> str | None:
+    """
+    Huella de un subárbol DOM: etiqueta + texto normalizado.
+    Los bloques muy cortos no se consideran (evita eliminar palabras sueltas).
+    """
+    text = re.sub(r'\s+', ' ', tag.get_text(' ')).strip().lower()
+    if len(text) < BOILERPLATE_MIN_TEXT:
+        return None
+    return hashlib.sha1(f"{tag.name}|{text}".encode('utf-8')).hexdigest()
+
+def page_block_fingerprints(main_content) -> set[str]:
+    """Huellas de todos los bloques candidatos de una página."""
+    fingerprints = set()
+    for tag in main_content.find_all(BOILERPLATE_BLOCK_TAGS):
+        fp = fingerprint_block(tag)
+        if fp:
+            fingerprints.add(fp)
+    return fingerprints
+
+def select_site_boilerplate(pages_fingerprints: list[set[str]], min_ratio: float = BOILERPLATE_MIN_RATIO,
+                            min_pages: int = BOILERPLATE_MIN_PAGES) -> set[str]:
+    """Devuelve las huellas que se repiten en la mayoría de las páginas del sitio."""
+    counts = Counter()
+    for fingerprints in pages_fingerprints:
+        counts.update(fingerprints)
+    threshold = max(min_pages, math.ceil(min_ratio * len(pages_fingerprints)))
+    return {fp for fp, count in counts.items() if count >= threshold}
+
+def strip_site_boilerplate(main_content, boilerplate_fps, removed_blocks: dict | None = None) -> int:
+    """
+    Elimina del contenido principal los bloques repetidos en el sitio. Devuelve cuántos quitó.
+    Si se pasa `removed_blocks`, guarda ahí {huella: html} de los bloques más externos eliminados.
+    """
+    if not boilerplate_fps:
+        return 0
+    removed = 0
+    for tag in main_content.find_all(BOILERPLATE_BLOCK_TAGS):
+        # Los descendientes de un bloque ya eliminado quedan marcados como 'decomposed'
+        if tag.decomposed:
+            continue
+        fp = fingerprint_block(tag)
+        if fp in boilerplate_fps:
+            if removed_blocks is not None:
+                removed_blocks.setdefault(fp, str(tag))
+            tag.decompose()
+            removed += 1
+    return removed
+
+# ==============================================================================
+# SECCIÓN 2.3: MANIFIESTO DEL SITIO (MIGRACIÓN INCREMENTAL)
+# ==============================================================================
+# Cambiar esta versión fuerza el reprocesado de todas las páginas en el próximo sync
+PIPELINE_VERSION = "3.9"
+MANIFEST_FILENAME = "manifest.json"
+SITE_COMPONENTS_FILENAME = "site_components.json"
+
+def load_site_manifest(output_dir: str) -> dict | None:
+    """Carga el manifiesto del sitio o devuelve None si todavía no existe."""
+    path = os.path.join(output_dir, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️  Manifiesto ilegible, se ignorará: {e}")
+        return None
+
+def save_site_manifest(output_dir: str, manifest: dict):
+    """Guarda el manifiesto del sitio de forma atómica."""
+    path = os.path.join(output_dir, MANIFEST_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def content_hash(main_content_soup) -> str:
+    """Hash del contenido principal limpio, normalizado para ignorar espacios."""
+    normalized = minify_html(str(main_content_soup))
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+def fetch_page_conditional(url: str, entry: dict | None) -> requests.Response:
+    """
+    GET condicional usando el ETag / Last-Modified guardados en el manifiesto.
+    Si el servidor responde 304 la página no cambió y no hace falta renderizarla.
+    """
+    headers = {}
+    if entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    return requests.get(url, headers=headers, timeout=10)
+
+def is_entry_current(entry: dict | None, seo_keyword: str) -> bool:
+    """Una entrada es reutilizable si se generó con la misma keyword y versión del pipeline."""
+    return bool(entry) and entry.get('keyword') == seo_keyword and entry.get('pipeline_version') == PIPELINE_VERSION
+
 # ============================================================================== 
 # SECCIÓN 2.5: AGENTE OPTIMIZADOR SEO (NUEVO)
 # ==============================================================================
-def run_seo_agent(blueprint: dict, seo_keyword: str) -> dict | None:
+def run_seo_agent(blueprint: dict, seo_keyword: str, memory: SeoRewriteMemory | None = None) -> dict | None:
     """
     Toma un blueprint de contenido y lo optimiza para una palabra clave SEO específica.
+    Si se pasa una memoria de reescrituras, solo se envían al LLM los componentes nuevos.
     """
     if not model:
         print("El modelo de IA no está configurado. Omitiendo optimización SEO.")
@@ -397,6 +951,50 @@ def run_seo_agent(blueprint: dict, seo_keyword: str) -> dict | None:
         
     print(f"📈 Agente SEO: Iniciando optimización para la palabra clave -> '{seo_keyword}'")
 
+    if memory is not None:
+        return run_seo_agent_with_memory(blueprint, seo_keyword, memory)
+    return request_seo_rewrite(blueprint, seo_keyword)
+
+def run_seo_agent_with_memory(blueprint: dict, seo_keyword: str, memory: SeoRewriteMemory) -> dict:
+    """Reutiliza reescrituras previas y envía al LLM únicamente los componentes sin coincidencia."""
+    optimized_blueprint = copy.deepcopy(blueprint)
+    pending = []
+    for component in iter_text_components(optimized_blueprint.get('main_content_blueprint', [])):
+        rewrite = memory.lookup(component, seo_keyword)
+        if rewrite:
+            apply_rewrite(component, rewrite)
+        else:
+            pending.append(component)
+
+    if pending:
+        originals = [copy.deepcopy(c) for c in pending]
+        fragment = {
+            "schema_version": optimized_blueprint.get('schema_version', "1.1"),
+            "source_url": optimized_blueprint.get('source_url', ''),
+            "main_content_blueprint": copy.deepcopy(originals)
+        }
+        result = request_seo_rewrite(fragment, seo_keyword)
+        rewritten = result.get('main_content_blueprint') if isinstance(result, dict) and result is not fragment else None
+        if isinstance(rewritten, list):
+            # Emparejar por posición si la IA respetó la lista; si no, por id
+            if len(rewritten) != len(pending):
+                by_id = {c.get('id'): c for c in rewritten if isinstance(c, dict)}
+                rewritten = [by_id.get(c.get('id')) for c in pending]
+            for component, original, new_component in zip(pending, originals, rewritten):
+                if not isinstance(new_component, dict):
+                    continue
+                rewrite = extract_rewrite(new_component)
+                apply_rewrite(component, rewrite)
+                memory.store(original, seo_keyword, rewrite)
+        memory.save()
+    else:
+        print("✅ Agente SEO: Todos los componentes reutilizados desde la memoria, sin llamada al LLM.")
+
+    memory.report()
+    return optimized_blueprint
+
+def request_seo_rewrite(blueprint: dict, seo_keyword: str) -> dict:
+    """Envía el blueprint a Gemini para reescribirlo. Devuelve el original si algo falla."""
     # Convertir el blueprint a un string JSON para enviarlo a la IA
     blueprint_str = json.dumps(blueprint, indent=2)
 
@@ -456,7 +1054,7 @@ Responde ÚNICAMENTE con el JSON completo y optimizado. No incluyas explicacione
 # ==============================================================================
 # SECCIÓN 3: AGENTE CONSTRUCTOR CORREGIDO (v2.4)
 # ==============================================================================
-def run_generator_agent(blueprint: dict) -> str:
+def run_generator_agent(blueprint: dict, site_components: dict | None = None) -> str:
     print("✍️ Agente Constructor (v2.4): Iniciando la generación de la guía...")
     
     # Detector universal de contenido CORREGIDO
@@ -530,16 +1128,40 @@ def run_generator_agent(blueprint: dict) -> str:
             guide_parts.append("En su CMS, agregue una **sección de ancho completo**.")
             guide_parts.append(f"**Widget: {component_type}**\n```html\n{build_html_for_component(component)}\n```")
 
+    shared_list = get_site_component_list(site_components)
+    if shared_list:
+        guide_parts.append("---\n\n### Componentes compartidos del sitio")
+        guide_parts.append("Cree estos bloques **una sola vez** como sección global (p. ej. el pie de página) "
+                           "y reutilícela en todas las páginas del sitio.")
+        for component in shared_list:
+            guide_parts.append(f"**Widget: {component.get('component_type')}**\n```html\n{build_html_for_component(component)}\n```")
+
     print("✅ Agente Constructor: Guía completada.")
     return "\n".join(guide_parts)
 
+def get_site_component_list(site_components: dict | None) -> list:
+    """Componentes compartidos del sitio (los bloques que se quitaron de cada página)."""
+    if not site_components:
+        return []
+    return [c for c in site_components.get('main_content_blueprint', []) if isinstance(c, dict)]
+
+def select_page_site_components(site_components: dict | None, page_block_fps) -> dict | None:
+    """
+    Solo los componentes compartidos cuyos bloques se quitaron de esta página: un bloque
+    que aparece en el 60% de las páginas no debe añadirse al 40% restante.
+    """
+    page_block_fps = set(page_block_fps or ())
+    components = [c for c in get_site_component_list(site_components) if c.get('block_id') in page_block_fps]
+    return {**site_components, "main_content_blueprint": components} if components else None
+
 # ============================================================================== 
 # SECCIÓN 3.5: GENERADOR DE PÁGINA HTML (ACTUALIZADO CON BOOTSTRAP)
 # ==============================================================================
-def create_full_html_page(blueprint: dict) -> str:
+def create_full_html_page(blueprint: dict, site_components: dict | None = None) -> str:
     """
     Toma el blueprint final y genera una página HTML completa y funcional
-    utilizando el framework de Bootstrap para el diseño.
+    utilizando el framework de Bootstrap para el diseño. Los componentes
+    compartidos del sitio, si los hay, se añaden como sección común al final.
     """
     print("🏗️ Generador HTML: Ensamblando página completa con Bootstrap...")
     # --- Extraer contenido y título ---
@@ -550,11 +1172,16 @@ def create_full_html_page(blueprint: dict) -> str:
             page_title = component.get("content", {}).get("text", page_title)
             break
     html_parts = [build_html_for_component(c) for c in component_list if isinstance(c, dict)]
+    shared_parts = [build_html_for_component(c) for c in get_site_component_list(site_components)]
+    shared_section = f'<section class="border-top mt-5 pt-4">{"".join(shared_parts)}</section>' if shared_parts else ""
     body_content = f"""
     <div class=\"container mt-5\">
         {''.join(html_parts)}
+        {shared_section}
     </div>
     """
+    # CSS crítico purgado e incrustado; el JS de Bootstrap solo si hay componentes interactivos
+    bootstrap_css, bootstrap_js = build_bootstrap_assets(body_content)
     full_page_html = f"""
 <!DOCTYPE html>
 <html lang=\"es\">
@@ -562,7 +1189,7 @@ def create_full_html_page(blueprint: dict) -> str:
     <meta charset=\"UTF-8\">
     <meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">
     <title>{page_title}</title>
-    <link href=\"https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css\" rel=\"stylesheet\" integrity=\"sha384-QWTKZyjpPEjISv5WaRU9OFeRpok6YctnYmDr5pNlyT2bRjXh0JMhjY6hW+ALEwIH\" crossorigin=\"anonymous\">
+    {bootstrap_css}
     <style>
         body {{
             font-family: -apple-system, BlinkMacSystemFont, \"Segoe UI\", Roboto, \"Helvetica Neue\", Arial, sans-serif;
@@ -574,7 +1201,7 @@ def create_full_html_page(blueprint: dict) -> str:
 </head>
 <body>
     {body_content}
-    <script src=\"https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js\" integrity=\"sha384-YvpcrYf0tY3lHB60NNkmXc5s9fDVZLESaAA55NDzOxhy9GkcIdslK1eN7N6jIeHz\" crossorigin=\"anonymous\"></script>
+    {bootstrap_js}
 </body>
 </html>
     """
@@ -589,13 +1216,482 @@ def save_html_to_file(html_content: str, filename: str = "pagina_migrada.html"):
     except Exception as e:
         print(f"❌ Error al guardar el archivo HTML: {e}")
 
+# ==============================================================================
+# SECCIÓN 3.6: EJECUCIÓN EN POOL DE PROCESOS (ETAPAS CPU)
+# ==============================================================================
+# Parseo, limpieza y renderizado son Python puro y retienen el GIL: se reparten
+# entre procesos. Entre procesos solo viajan bytes de HTML y resultados compactos.
+def _init_html_worker():
+    """Calienta cada worker: carga el parser y la copia local de Bootstrap una sola vez."""
+    make_soup("<html><body><p>warmup</p></body></html>")
+    load_vendored_bootstrap()
+
+def create_html_pool(workers: int | None = None) -> ProcessPoolExecutor:
+    # El CSS se carga en el proceso padre antes de crear los workers: con fork lo heredan ya en caché
+    load_vendored_bootstrap()
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_html_worker)
+
+def run_html_stage(worker, args_list: list[tuple], pool: ProcessPoolExecutor | None = None) -> list:
+    """Ejecuta una etapa CPU en el pool (o en serie si no hay pool) conservando el orden."""
+    if not args_list:
+        return []
+    if pool is None:
+        return [worker(*args) for args in args_list]
+    return list(pool.map(worker, *zip(*args_list)))
+
+def parse_page_content(html_bytes: bytes):
+    """Parsea una página renderizada y devuelve su contenido principal ya limpio."""
+    try:
+        return clean_and_extract_content(make_soup(html_bytes.decode('utf-8')))
+    except Exception as e:
+        print(f"❌ Error al analizar la página: {e}")
+        return None
+
+def fingerprint_page_worker(html_bytes: bytes) -> tuple[set[str], str, bytes] | None:
+    """
+    Parsea y limpia una página. Devuelve las huellas de sus bloques y el contenido principal
+    ya limpio (etiqueta raíz y HTML), mucho más pequeño que la página: la segunda pasada parte
+    de él en lugar de volver a parsear y limpiar el documento completo.
+    """
+    main_content_soup = parse_page_content(html_bytes)
+    if main_content_soup is None:
+        return None
+    return page_block_fingerprints(main_content_soup), main_content_soup.name, str(main_content_soup).encode('utf-8')
+
+def prepare_page_worker(root_name: str, main_html: bytes, boilerplate_fps) -> dict | None:
+    """Elimina boilerplate y trunca el contenido limpio de la primera pasada. Devuelve solo cadenas."""
+    if not main_html:
+        return None
+    try:
+        # El primer elemento con la etiqueta raíz, en orden de documento, es el propio contenido
+        main_content_soup = make_soup(main_html.decode('utf-8')).find(root_name)
+    except Exception as e:
+        print(f"❌ Error al analizar el contenido limpio: {e}")
+        return None
+    return prepare_page_content(main_content_soup, boilerplate_fps) if main_content_soup is not None else None
+
+def prepare_page_content(main_content_soup, boilerplate_fps) -> dict | None:
+    """Elimina el boilerplate de un contenido ya limpio y lo trunca para el mapeo."""
+    try:
+        tokens_before = estimate_token_count(str(main_content_soup))
+        removed_blocks = {}
+        removed = strip_site_boilerplate(main_content_soup, boilerplate_fps, removed_blocks)
+        return {
+            "html_to_analyze": prepare_html_for_mapping(main_content_soup),
+            "content_hash": content_hash(main_content_soup),
+            "tokens_before": tokens_before,
+            "removed": removed,
+            "removed_blocks": removed_blocks,
+        }
+    except Exception as e:
+        print(f"❌ Error al preparar la página: {e}")
+        return None
+
+def render_page_worker(blueprint_json: str, site_components_json: str = "null") -> tuple[str, str] | None:
+    """Genera la guía de migración y la página HTML completa de un blueprint."""
+    try:
+        blueprint = json.loads(blueprint_json)
+        site_components = json.loads(site_components_json)
+        return run_generator_agent(blueprint, site_components), create_full_html_page(blueprint, site_components)
+    except Exception as e:
+        print(f"❌ Error al renderizar el blueprint: {e}")
+        return None
+
+def run_page_analysis(raw_pages: list[bytes], pool: ProcessPoolExecutor | None = None) -> tuple[list, set[str]]:
+    """
+    Pasos CPU de la migración de un sitio: huellas de bloques, selección del boilerplate
+    y preparación de cada página. En serie se conservan los árboles limpios entre las dos
+    pasadas; en el pool viaja entre ellas solo el HTML del contenido principal.
+    Devuelve los resultados de prepare_page_content (None si la página falló) y el boilerplate.
+    """
+    if pool is None:
+        trees = [parse_page_content(html_bytes) for html_bytes in raw_pages]
+        fingerprints = [page_block_fingerprints(t) if t is not None else None for t in trees]
+    else:
+        analyzed = run_html_stage(fingerprint_page_worker, [(html_bytes,) for html_bytes in raw_pages], pool)
+        fingerprints = [a[0] if a else None for a in analyzed]
+    boilerplate = select_site_boilerplate([fps for fps in fingerprints if fps is not None])
+
+    if pool is None:
+        prepared = [prepare_page_content(t, boilerplate) if t is not None else None for t in trees]
+    else:
+        prepared = run_html_stage(prepare_page_worker, [(a[1], a[2], boilerplate) if a else (None, None, None)
+                                                        for a in analyzed], pool)
+    return prepared, boilerplate
+
+def benchmark_html_pool(html_files: list[str], worker_counts: list[int] | None = None, repeat: int = 10) -> list[dict]:
+    """
+    Mide el throughput de las etapas CPU de la migración (huellas + preparación, como en
+    run_site_migration) con distinto número de workers. Cada archivo se procesa `repeat`
+    veces para que el coste de arranque no domine.
+    """
+    pages = []
+    for path in html_files:
+        with open(path, "rb") as f:
+            pages.append(f.read())
+    tasks = pages * repeat
+    cpu_count = os.cpu_count() or 1
+    worker_counts = worker_counts or sorted({1, 2, 4, cpu_count} & set(range(1, cpu_count + 1)))
+
+    rows = []
+    for workers in worker_counts:
+        pool = create_html_pool(workers) if workers > 1 else None
+        try:
+            if pool:
+                # Arrancar y calentar los workers fuera de la medición
+                run_html_stage(fingerprint_page_worker, [(pages[0],)] * workers, pool)
+            start = time.perf_counter()
+            run_page_analysis(tasks, pool)
+            elapsed = time.perf_counter() - start
+        finally:
+            if pool:
+                pool.shutdown()
+        rows.append({"workers": workers, "seconds": round(elapsed, 3), "pages_per_second": round(len(tasks) / elapsed, 1)})
+
+    baseline = rows[0]["pages_per_second"]
+    print("\n" + "="*60)
+    print(" Benchmark del pool de procesos ".center(60))
+    print("="*60)
+    for row in rows:
+        row["speedup"] = round(row["pages_per_second"] / baseline, 2)
+        print(f"⚙️  {row['workers']} workers: {row['pages_per_second']} páginas/s (x{row['speedup']})")
+    return rows
+
 # ==============================================================================
 # SECCIÓN 4: ORQUESTADOR PRINCIPAL
 # ==============================================================================
-def main():
+def run_site_migration(start_url: str, seo_keyword: str, output_dir: str = "sitio_migrado",
+                       max_pages: int = SITE_MAX_PAGES, max_depth: int = SITE_MAX_DEPTH,
+                       render_profile: str | None = None, optimize_images: bool = False,
+                       workers: int = 1) -> dict:
+    """
+    Migra un sitio completo: descubre URLs, elimina los bloques que se repiten
+    entre páginas y los mapea una sola vez como componentes del sitio.
+    Con `workers` > 1 las etapas CPU se ejecutan en un pool de procesos.
+    """
+    if not model:
+        print("El modelo de IA no está configurado.")
+        return {}
+
+    os.makedirs(output_dir, exist_ok=True)
+    urls, _ = discover_site_urls(start_url, max_pages, max_depth)
+
+    # --- PASO 1: Renderizar todas las páginas ---
+    raw_pages = {}
+    render_metrics = []
+    profile_name = get_render_profile(start_url, render_profile)
+    driver = None
+    try:
+        driver = create_chrome_driver(profile_name)
+        for url in urls:
+            try:
+                print(f"🌐 Renderizando -> {url}")
+                html_content, metrics = fetch_rendered_html(driver, url, profile_name)
+                render_metrics.append(metrics)
+                raw_pages[url] = html_content.encode('utf-8')
+            except Exception as e:
+                print(f"❌ Error al renderizar {url}: {e}")
+    finally:
+        if driver:
+            driver.quit()
+
+    if render_metrics:
+        save_render_metrics(output_dir, render_metrics)
+
+    pool = create_html_pool(workers) if workers > 1 else None
+    try:
+        # --- PASO 2: Detectar boilerplate del sitio, limpiar y preparar cada página ---
+        page_urls = list(raw_pages)
+        prepared, boilerplate = run_page_analysis([raw_pages[u] for u in page_urls], pool)
+        raw_pages.clear()
+        print(f"🧹 Bloques repetidos en el sitio: {len(boilerplate)}")
+        prepared_pages = {url: page for url, page in zip(page_urls, prepared) if page}
+
+        # --- PASO 3: Mapear una sola vez los bloques compartidos como componentes del sitio ---
+        seo_memory = SeoRewriteMemory(os.path.join(output_dir, SEO_MEMORY_PATH))
+        shared_blocks = {}
+        for page in prepared_pages.values():
+            for fp, block_html in page["removed_blocks"].items():
+                shared_blocks.setdefault(fp, block_html)
+        site_components = None
+        if shared_blocks:
+            site_components = map_site_components(shared_blocks, start_url)
+            site_components = run_seo_agent(site_components, seo_keyword, seo_memory)
+            if optimize_images:
+                # Se renderizan al final de cada página: ninguna de sus imágenes es la LCP
+                optimize_blueprint_images(site_components, os.path.join(output_dir, "assets"), "assets",
+                                          base_url=start_url, first_above_the_fold=False)
+            with open(os.path.join(output_dir, SITE_COMPONENTS_FILENAME), "w", encoding="utf-8") as f:
+                json.dump(site_components, f, indent=2, ensure_ascii=False)
+
+        # --- PASO 4: Mapear y optimizar cada página sin el boilerplate (I/O con el LLM) ---
+        blueprints = {}
+        tokens_before = tokens_after = 0
+        for url, page in prepared_pages.items():
+            tokens_before += page["tokens_before"]
+            tokens_after += estimate_token_count(page["html_to_analyze"])
+            print(f"\n📄 {url} (bloques compartidos eliminados: {page['removed']})")
+            optimized_blueprint = optimize_site_page(url, page["html_to_analyze"], seo_keyword, output_dir,
+                                                     optimize_images, seo_memory)
+            if optimized_blueprint:
+                blueprints[url] = optimized_blueprint
+
+        # --- PASO 5: Generar guías y páginas HTML ---
+        results = {url: None for url in urls}
+        page_shared_blocks = {url: list(page["removed_blocks"]) for url, page in prepared_pages.items()}
+        results.update(render_site_pages(blueprints, output_dir, pool, site_components, page_shared_blocks))
+    finally:
+        if pool:
+            pool.shutdown()
+
+    manifest = {
+        "pipeline_version": PIPELINE_VERSION,
+        "start_url": start_url,
+        "keyword": seo_keyword,
+        "boilerplate_fingerprints": sorted(boilerplate),
+        "pages": {
+            url: build_manifest_entry(prepared_pages[url]["content_hash"], seo_keyword, filename,
+                                      shared_blocks=prepared_pages[url]["removed_blocks"])
+            for url, filename in results.items() if filename
+        }
+    }
+    save_site_manifest(output_dir, manifest)
+    print(f"\n📊 Tokens estimados del sitio: {tokens_before} -> {tokens_after} tras eliminar boilerplate")
+    return {"pages": results, "site_components": site_components}
+
+def build_manifest_entry(page_hash: str, seo_keyword: str, output_file: str,
+                         response: requests.Response | None = None, shared_blocks=None) -> dict:
+    """Entrada del manifiesto para una página ya procesada (con las huellas de sus bloques compartidos)."""
+    return {
+        "content_hash": page_hash,
+        "shared_blocks": sorted(shared_blocks or []),
+        "keyword": seo_keyword,
+        "pipeline_version": PIPELINE_VERSION,
+        "etag": response.headers.get('ETag') if response is not None else None,
+        "last_modified": response.headers.get('Last-Modified') if response is not None else None,
+        "output_file": output_file,
+        "updated_at": datetime.now(timezone.utc).isoformat()
+    }
+
+def optimize_site_page(url: str, html_to_analyze: str, seo_keyword: str, output_dir: str,
+                       optimize_images: bool = False, seo_memory: SeoRewriteMemory | None = None) -> dict | None:
+    """Mapea y optimiza para SEO una página. Devuelve el blueprint final."""
+    try:
+        blueprint = map_html_to_blueprint(html_to_analyze, url)
+    except Exception as e:
+        print(f"Error durante el análisis: {e}")
+        return None
+    if not blueprint:
+        return None
+    optimized_blueprint = run_seo_agent(blueprint, seo_keyword, seo_memory)
+    if optimize_images:
+        # Los assets se comparten entre todas las páginas del sitio (misma caché)
+        optimize_blueprint_images(optimized_blueprint, os.path.join(output_dir, "assets"), "assets", base_url=url)
+    return optimized_blueprint
+
+def load_site_components(output_dir: str) -> dict | None:
+    """Componentes compartidos guardados por la última migración completa, o None."""
+    path = os.path.join(output_dir, SITE_COMPONENTS_FILENAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️  No se pudieron leer los componentes compartidos del sitio: {e}")
+        return None
+
+def render_site_pages(blueprints: dict, output_dir: str, pool: ProcessPoolExecutor | None = None,
+                      site_components: dict | None = None, page_shared_blocks: dict | None = None) -> dict:
+    """
+    Genera la guía (.md) y la página (.html) de cada blueprint. Devuelve {url: archivo_html}.
+    `page_shared_blocks` indica, por URL, las huellas de los bloques compartidos que tenía la página.
+    """
+    urls = list(blueprints)
+    page_shared_blocks = page_shared_blocks or {}
+    rendered = run_html_stage(render_page_worker, [
+        (json.dumps(blueprints[u]), json.dumps(select_page_site_components(site_components, page_shared_blocks.get(u))))
+        for u in urls
+    ], pool)
+    filenames = {}
+    for url, result in zip(urls, rendered):
+        if not result:
+            continue
+        migration_guide, page_html = result
+        base_name = os.path.join(output_dir, url_to_slug(url))
+        with open(f"{base_name}.md", "w", encoding="utf-8") as f:
+            f.write(migration_guide)
+        save_html_to_file(page_html, f"{base_name}.html")
+        filenames[url] = f"{base_name}.html"
+    return filenames
+
+def find_stale_shared_blocks(lost_counts: Counter, had_counts: Counter, pages: dict) -> set[str]:
+    """
+    Bloques compartidos que desaparecieron de la mayoría de las páginas re-descargadas que los
+    tenían (y de al menos BOILERPLATE_MIN_PAGES, o de todas si el sitio tiene menos).
+    """
+    stale = set()
+    for fp, lost in lost_counts.items():
+        pages_with_block = sum(1 for entry in pages.values() if fp in entry.get('shared_blocks', []))
+        if lost * 2 > had_counts[fp] and lost >= min(BOILERPLATE_MIN_PAGES, pages_with_block):
+            stale.add(fp)
+    return stale
+
+def run_full_resync(previous_pages: dict, start_url: str, seo_keyword: str, output_dir: str,
+                    max_pages: int, max_depth: int, render_profile: str | None,
+                    optimize_images: bool, workers: int) -> dict:
+    """
+    Migración completa desde un sync: recalcula boilerplate y componentes compartidos.
+    Las páginas del manifiesto anterior que no entren en ella se conservan en el nuevo, para
+    que un sync posterior con descubrimiento completo decida si se eliminaron.
+    """
+    result = run_site_migration(start_url, seo_keyword, output_dir, max_pages, max_depth,
+                                render_profile, optimize_images, workers)
+    migrated = [u for u, f in result.get("pages", {}).items() if f]
+    manifest = load_site_manifest(output_dir)
+    if manifest is not None and previous_pages:
+        for url, entry in previous_pages.items():
+            manifest["pages"].setdefault(url, entry)
+        save_site_manifest(output_dir, manifest)
+    return {"added": [u for u in migrated if u not in previous_pages],
+            "changed": [u for u in migrated if u in previous_pages], "removed": [], "skipped": []}
+
+def run_site_sync(start_url: str, seo_keyword: str, output_dir: str = "sitio_migrado",
+                  max_pages: int = SITE_MAX_PAGES, max_depth: int = SITE_MAX_DEPTH,
+                  render_profile: str | None = None, optimize_images: bool = False,
+                  workers: int = 1) -> dict:
+    """
+    Re-migración incremental: solo las páginas nuevas o cuyo contenido cambió
+    pasan por mapeo, SEO y renderizado. Devuelve el informe de cambios.
+    """
+    manifest = load_site_manifest(output_dir)
+    if manifest is None:
+        print("⚠️  No existe manifiesto previo. Ejecutando migración completa del sitio...")
+        return run_full_resync({}, start_url, seo_keyword, output_dir, max_pages, max_depth,
+                               render_profile, optimize_images, workers)
+    if manifest.get("keyword") != seo_keyword or manifest.get("pipeline_version") != PIPELINE_VERSION:
+        # Los componentes compartidos del sitio se generaron con otra keyword o versión del pipeline
+        print("⚠️  Cambió la keyword o la versión del pipeline. Ejecutando migración completa del sitio...")
+        return run_full_resync(manifest.get("pages", {}), start_url, seo_keyword, output_dir, max_pages, max_depth,
+                               render_profile, optimize_images, workers)
+
+    if not model:
+        print("El modelo de IA no está configurado.")
+        return {}
+
+    urls, discovery_complete = discover_site_urls(start_url, max_pages, max_depth)
+
+    pages = manifest.setdefault("pages", {})
+    boilerplate_fps = set(manifest.get("boilerplate_fingerprints", []))
+    report = {"added": [], "changed": [], "removed": [], "skipped": []}
+
+    profile_name = get_render_profile(start_url, render_profile)
+    seo_memory = SeoRewriteMemory(os.path.join(output_dir, SEO_MEMORY_PATH))
+    blueprints = {}
+    pending = {}  # url -> (hash, respuesta HTTP, entrada previa, huellas compartidas quitadas)
+    to_map = {}  # url -> HTML a mapear
+    lost_counts, had_counts = Counter(), Counter()
+    driver = None
+    try:
+        for url in urls:
+            entry = pages.get(url)
+            try:
+                response = fetch_page_conditional(url, entry)
+                if response.status_code == 304 and is_entry_current(entry, seo_keyword):
+                    report["skipped"].append(url)
+                    continue
+                response.raise_for_status()
+
+                # Se renderiza igual que en la migración completa para que el hash sea comparable
+                if driver is None:
+                    driver = create_chrome_driver(profile_name)
+                html_content, _ = fetch_rendered_html(driver, url, profile_name)
+                soup = make_soup(html_content)
+                main_content_soup = clean_and_extract_content(soup)
+                if entry:
+                    # ¿Siguen en la página los bloques compartidos que se le quitaron la última vez?
+                    previous_blocks = set(entry.get('shared_blocks', []))
+                    had_counts.update(previous_blocks)
+                    lost_counts.update(previous_blocks - page_block_fingerprints(main_content_soup))
+                removed_blocks = {}
+                strip_site_boilerplate(main_content_soup, boilerplate_fps, removed_blocks)
+                page_hash = content_hash(main_content_soup)
+            except Exception as e:
+                print(f"❌ Error al sincronizar {url}: {e}")
+                continue
+
+            if is_entry_current(entry, seo_keyword) and entry.get('content_hash') == page_hash:
+                # Sin cambios: solo se actualizan los validadores HTTP
+                pages[url] = build_manifest_entry(page_hash, seo_keyword, entry.get('output_file'), response,
+                                                  entry.get('shared_blocks'))
+                report["skipped"].append(url)
+                continue
+
+            to_map[url] = prepare_html_for_mapping(main_content_soup)
+            pending[url] = (page_hash, response, entry, list(removed_blocks))
+    finally:
+        if driver:
+            driver.quit()
+
+    stale_blocks = find_stale_shared_blocks(lost_counts, had_counts, pages)
+    if stale_blocks:
+        # Un bloque compartido editado (p. ej. un aviso legal) ya no coincide: quedaría incrustado en
+        # cada página y site_components.json seguiría mostrando la versión antigua
+        print(f"⚠️  {len(stale_blocks)} bloques compartidos cambiaron en el sitio. Ejecutando migración completa...")
+        return run_full_resync(pages, start_url, seo_keyword, output_dir, max_pages, max_depth,
+                               render_profile, optimize_images, workers)
+
+    for url, html_to_analyze in to_map.items():
+        print(f"\n🔄 {'Cambio' if pending[url][2] else 'Nueva página'} detectado -> {url}")
+        optimized_blueprint = optimize_site_page(url, html_to_analyze, seo_keyword, output_dir,
+                                                 optimize_images, seo_memory)
+        if optimized_blueprint:
+            blueprints[url] = optimized_blueprint
+
+    pool = create_html_pool(workers) if workers > 1 and len(blueprints) > 1 else None
+    try:
+        filenames = render_site_pages(blueprints, output_dir, pool, load_site_components(output_dir),
+                                      {url: pending[url][3] for url in blueprints})
+    finally:
+        if pool:
+            pool.shutdown()
+    for url, filename in filenames.items():
+        page_hash, response, entry, shared_blocks = pending[url]
+        pages[url] = build_manifest_entry(page_hash, seo_keyword, filename, response, shared_blocks)
+        report["changed" if entry else "added"].append(url)
+
+    # Una URL ausente de un descubrimiento parcial no significa que se haya eliminado del sitio
+    missing = [u for u in pages if u not in urls]
+    if missing and not discovery_complete:
+        print(f"⚠️  {len(missing)} páginas no aparecen en el descubrimiento parcial; se conservan sus archivos.")
+        missing = []
+    for url in missing:
+        output_file = pages.pop(url).get('output_file')
+        for path in ([output_file, os.path.splitext(output_file)[0] + ".md"] if output_file else []):
+            if os.path.exists(path):
+                os.remove(path)
+        report["removed"].append(url)
+
+    manifest["pipeline_version"] = PIPELINE_VERSION
+    save_site_manifest(output_dir, manifest)
+
+    print("\n📋 Informe de sincronización:")
+    for key, label in [("added", "Añadidas"), ("changed", "Modificadas"), ("removed", "Eliminadas"), ("skipped", "Sin cambios")]:
+        print(f"   {label}: {len(report[key])}")
+    return report
+
+def main(site_mode: bool = False, sync_mode: bool = False, optimize_images: bool = False, workers: int = 1):
     print("🚀 Orquestador v3.3 (con Bootstrap): Iniciando pipeline...")
     target_url = "https://www.legacychryslerjeepdodgeram.net/car-dealership-serving/pendleton-or/"
     seo_keyword = "concesionario de autos en Pendleton OR"
+    if sync_mode:
+        run_site_sync(target_url, seo_keyword, optimize_images=optimize_images, workers=workers)
+        print("\n✅ Orquestador: Proceso finalizado.")
+        return
+    if site_mode:
+        run_site_migration(target_url, seo_keyword, optimize_images=optimize_images, workers=workers)
+        print("\n✅ Orquestador: Proceso finalizado.")
+        return
     json_blueprint = run_mapping_agent(target_url)
     if json_blueprint:
         print("\n" + "="*60)
@@ -603,6 +1699,9 @@ def main():
         print("="*60)
         print(json.dumps(json_blueprint, indent=2, ensure_ascii=False)[:1000] + "...")
         optimized_blueprint = run_seo_agent(json_blueprint, seo_keyword)
+        if optimize_images:
+            # Antes de la guía, para que sus snippets ya usen las variantes locales con srcset
+            optimize_blueprint_images(optimized_blueprint, "assets", "assets", base_url=target_url)
         migration_guide = run_generator_agent(optimized_blueprint)
         print("\n" + "="*60)
         print(" Guía de Migración Final (con contenido SEO) ".center(60))
@@ -619,4 +1718,10 @@ def main():
     print("\n✅ Orquestador: Proceso finalizado.")
 
 if __name__ == "__main__":
-    main()
+    if "--bench" in sys.argv:
+        # python generator_agent.py --bench pagina1.html pagina2.html ...
+        benchmark_html_pool([arg for arg in sys.argv[1:] if not arg.startswith("--")])
+    else:
+        worker_args = [arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--workers=")]
+        main(site_mode="--site" in sys.argv, sync_mode="--sync" in sys.argv,
+             optimize_images="--images" in sys.argv, workers=int(worker_args[0]) if worker_args else 1)
@@ -0,0 +1,244 @@
+"""
+Backends de parseo HTML compartidos por la app y el pipeline de migración.
+
+- make_soup: construye el árbol con lxml (C) si está instalado y cae a
+  'html.parser' en caso contrario.
+- stream_extract: extracción en streaming que nunca materializa el árbol
+  completo y se detiene en cuanto se llena el presupuesto de caracteres.
+- compare_parsers: tiempo y pico de RSS de cada backend
+  (python html_parsers.py --bench pagina.html).
+"""
+import codecs
+import multiprocessing
+import os
+import sys
+import time
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+try:
+    import resource
+except ImportError:  # Windows: sin getrusage no se mide la memoria
+    resource = None
+
+try:
+    from lxml import etree
+    PARSER_BACKEND = "lxml"
+except ImportError:
+    etree = None
+    PARSER_BACKEND = "html.parser"
+
+FALLBACK_PARSER = "html.parser"
+
+def make_soup(markup, parser: str | None = None) -> BeautifulSoup:
+    """Crea un BeautifulSoup con el backend más rápido disponible."""
+    return BeautifulSoup(markup, parser or PARSER_BACKEND)
+
+# ==============================================================================
+# EXTRACCIÓN EN STREAMING
+# ==============================================================================
+# Cada regla: etiquetas y/o clase CSS que debe cumplir el elemento, un prefijo para su
+# texto y el separador entre sus fragmentos (como get_text(separator=..., strip=True))
+DEFAULT_EXTRACTION_RULES = [
+    {"tags": {"h1", "h2", "h3"}, "separator": ""},
+    {"class": "caption"},
+    {"class": "price", "prefix": "Precio: ", "separator": ""},
+]
+# Etiquetas sin cierre: nunca abren una captura en el parser de la stdlib
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+def _match_rules(tag: str, classes: str | None, rules: list[dict]) -> list[int]:
+    """Índices de todas las reglas que cumple el elemento (cada regla es una pasada independiente)."""
+    class_list = (classes or "").split()
+    matches = []
+    for index, rule in enumerate(rules):
+        if "tags" in rule and tag not in rule["tags"]:
+            continue
+        if "class" in rule and rule["class"] not in class_list:
+            continue
+        matches.append(index)
+    return matches
+
+def _format_part(rule: dict, texts) -> str:
+    text = rule.get("separator", " ").join(t.strip() for t in texts if t and t.strip())
+    return f"{rule.get('prefix', '')}{text}" if text else ""
+
+class _BudgetReached(Exception):
+    pass
+
+class _StreamCollector:
+    """
+    Agrupa los fragmentos por regla, como una pasada de select() por regla: primero
+    los de la regla 0, luego los de la 1, etc. Se deja de leer en cuanto el total
+    llena `max_chars`, así que la agrupación se aplica a la parte del documento leída
+    hasta ese punto (un título posterior ya no adelanta a los precios ya leídos).
+    """
+
+    def __init__(self, rules: list[dict], max_chars: int):
+        self.rules = rules
+        self.max_chars = max_chars
+        self.buckets = [[] for _ in rules]
+        self.length = 0
+
+    def add(self, rule_index: int, texts):
+        part = _format_part(self.rules[rule_index], texts)
+        if not part:
+            return
+        self.buckets[rule_index].append(part)
+        self.length += len(part) + 1
+        if self.length >= self.max_chars:
+            raise _BudgetReached()
+
+    @property
+    def parts(self) -> list[str]:
+        return [part for bucket in self.buckets for part in bucket]
+
+def _stream_lxml(chunks, rules, collector, encoding):
+    parser = etree.HTMLPullParser(events=("start", "end"), encoding=encoding)
+    capturing = {}  # elemento -> reglas que cumple, incluidos los anidados
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if not isinstance(elem.tag, str):
+                continue  # comentarios e instrucciones de procesamiento
+            if event == "start":
+                matches = _match_rules(elem.tag, elem.get("class"), rules)
+                if matches:
+                    capturing[elem] = matches
+                continue
+            for rule_index in capturing.pop(elem, ()):
+                collector.add(rule_index, elem.itertext())
+            if not capturing:
+                # Liberar memoria: el árbol procesado no se vuelve a necesitar
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+    parser.close()
+
+class _StdlibStreamParser(HTMLParser):
+    def __init__(self, rules, collector):
+        super().__init__(convert_charrefs=True)
+        self.rules = rules
+        self.collector = collector
+        self.captures = []  # [etiqueta, profundidad, reglas, textos] de cada captura abierta
+        self.in_text = False  # un nodo de texto puede llegar partido entre dos chunks
+
+    def handle_starttag(self, tag, attrs):
+        self.in_text = False
+        if tag in VOID_TAGS:
+            return
+        for capture in self.captures:
+            if capture[0] == tag:
+                capture[1] += 1
+        matches = _match_rules(tag, dict(attrs).get("class"), self.rules)
+        if matches:
+            self.captures.append([tag, 1, matches, []])
+
+    def handle_endtag(self, tag):
+        self.in_text = False
+        for capture in list(self.captures):
+            if capture[0] != tag:
+                continue
+            capture[1] -= 1
+            if capture[1] == 0:
+                self.captures.remove(capture)
+                for rule_index in capture[2]:
+                    self.collector.add(rule_index, capture[3])
+
+    def handle_comment(self, data):
+        self.in_text = False
+
+    def handle_data(self, data):
+        for capture in self.captures:
+            if self.in_text and capture[3]:
+                capture[3][-1] += data
+            else:
+                capture[3].append(data)
+        self.in_text = True
+
+def _stream_stdlib(chunks, rules, collector, encoding):
+    parser = _StdlibStreamParser(rules, collector)
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    for chunk in chunks:
+        parser.feed(decoder.decode(chunk) if isinstance(chunk, bytes) else chunk)
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+
+def stream_extract(chunks, rules: list[dict] | None = None, max_chars: int = 8000,
+                   encoding: str | None = None) -> list[str]:
+    """
+    Extrae el texto de los elementos que cumplen cada regla, agrupado por regla y en
+    orden de documento dentro de cada grupo. Los elementos anidados cuentan para todas
+    las reglas que cumplen. `chunks` es un iterable de bytes/str (p. ej.
+    response.iter_content()); se deja de leer en cuanto el texto extraído llena
+    `max_chars`, sin descargar ni parsear el resto de la página.
+    """
+    if isinstance(chunks, (str, bytes)):
+        chunks = [chunks]
+    rules = rules or DEFAULT_EXTRACTION_RULES
+    collector = _StreamCollector(rules, max_chars)
+    try:
+        if etree is not None:
+            byte_chunks = (c.encode(encoding or "utf-8") if isinstance(c, str) else c for c in chunks)
+            _stream_lxml(byte_chunks, rules, collector, encoding)
+        else:
+            _stream_stdlib(chunks, rules, collector, encoding)
+    except _BudgetReached:
+        pass
+    return collector.parts
+
+# ==============================================================================
+# MEDICIÓN
+# ==============================================================================
+# tracemalloc solo ve la memoria de Python; la de libxml2 (lxml) se reserva en C.
+# Por eso cada backend se mide en un proceso hijo limpio con el pico de RSS del SO.
+def _peak_rss_kb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB, macOS en bytes
+    return peak / 1024 if sys.platform == "darwin" else float(peak)
+
+def _measure_in_child(path: str, parser: str) -> dict:
+    with open(path, "rb") as f:
+        markup = f.read()
+    baseline = _peak_rss_kb()
+    start = time.perf_counter()
+    if parser == "stream":
+        stream_extract([markup[i:i + 64 * 1024] for i in range(0, len(markup), 64 * 1024)])
+    else:
+        # ru_maxrss es un máximo histórico: el árbol ya contó en el pico aunque se libere al momento
+        make_soup(markup, parser)
+    elapsed = time.perf_counter() - start
+    peak = _peak_rss_kb()
+    return {"parser": parser, "seconds": round(elapsed, 4),
+            "peak_rss_kb": round(peak - baseline, 1) if peak is not None else None}
+
+def measure_parse(path: str, parser: str | None = None) -> dict:
+    """Tiempo de parseo y pico de RSS de un backend ('stream' para stream_extract) en un proceso aparte."""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(_measure_in_child, (path, parser or PARSER_BACKEND))
+
+def compare_parsers(path: str) -> list[dict]:
+    """Compara el backend rápido, el de respaldo y el modo streaming sobre el mismo archivo HTML."""
+    parsers = [FALLBACK_PARSER]
+    if PARSER_BACKEND != FALLBACK_PARSER:
+        parsers.append(PARSER_BACKEND)
+    parsers.append("stream")
+
+    print(f"🧪 {path} ({os.path.getsize(path) / 1024:.1f} KB)")
+    results = [measure_parse(path, parser) for parser in parsers]
+    for row in results:
+        memory = f"+{row['peak_rss_kb']} KB" if row['peak_rss_kb'] is not None else "n/d"
+        print(f"🧪 {row['parser']}: {row['seconds']} s, pico RSS {memory}")
+    return results
+
+if __name__ == "__main__":
+    # python html_parsers.py --bench pagina1.html pagina2.html ...
+    if "--bench" in sys.argv:
+        for html_file in [arg for arg in sys.argv[1:] if not arg.startswith("--")]:
+            compare_parsers(html_file)
+    else:
+        print("Uso: python html_parsers.py --bench pagina1.html [pagina2.html ...]")
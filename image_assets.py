@@ -0,0 +1,211 @@
+"""
+Etapa opcional de optimización de imágenes para las páginas migradas.
+
+Descarga las imágenes referenciadas por el blueprint con un pool acotado,
+las deduplica por hash de contenido, genera variantes WebP/AVIF
+redimensionadas y reescribe los componentes 'Image' con dimensiones,
+srcset, sizes y carga diferida. Los resultados se cachean entre ejecuciones
+y se revalidan con GET condicional (ETag/Last-Modified).
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urljoin
+
+import requests
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+IMAGE_WIDTHS = [480, 768, 1200]
+# Orden de preferencia: el primero que soporte Pillow se usa como <source>, el último como <img>
+IMAGE_FORMATS = ["avif", "webp"]
+IMAGE_MIME_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+MAX_DOWNLOAD_WORKERS = 8
+# El contenido se renderiza dentro de .container (máx. ~1320px en Bootstrap 5)
+DEFAULT_IMAGE_SIZES = "(max-width: 1320px) 100vw, 1320px"
+CACHE_FILENAME = "image_cache.json"
+
+def iter_image_components(component_list):
+    """Recorre los componentes 'Image' en orden de documento, incluidos los de columnas."""
+    for component in component_list or []:
+        if not isinstance(component, dict):
+            continue
+        if component.get('component_type') == "Image":
+            yield component
+        content = component.get('content')
+        if component.get('component_type') == "ColumnsContainer" and isinstance(content, dict):
+            for col_widgets in content.get('columns', {}).values():
+                if isinstance(col_widgets, list):
+                    yield from iter_image_components(col_widgets)
+
+def get_image_src(component: dict) -> str:
+    content = component.get('content')
+    if not isinstance(content, dict):
+        return ''
+    return content.get('src', '') or component.get('layout_properties', {}).get('src', '')
+
+def supported_formats() -> list[str]:
+    """Formatos de salida que la instalación de Pillow puede escribir."""
+    if Image is None:
+        return []
+    Image.init()
+    return [fmt for fmt in IMAGE_FORMATS if fmt.upper() in Image.SAVE]
+
+def download_image(url: str, cached_entry: dict | None = None) -> requests.Response | None:
+    """
+    Descarga la imagen. Si hay una entrada en caché con ETag/Last-Modified se hace un GET
+    condicional: la respuesta es 304 cuando la imagen no cambió.
+    """
+    headers = {}
+    if cached_entry:
+        if cached_entry.get("etag"):
+            headers["If-None-Match"] = cached_entry["etag"]
+        if cached_entry.get("last_modified"):
+            headers["If-Modified-Since"] = cached_entry["last_modified"]
+    try:
+        r = requests.get(url, headers=headers, timeout=15)
+        if r.status_code == 304 and headers:
+            return r
+        r.raise_for_status()
+        return r
+    except requests.RequestException as e:
+        print(f"⚠️  No se pudo descargar la imagen {url}: {e}")
+        return None
+
+def response_validators(response: requests.Response) -> dict:
+    """Cabeceras de validación que se guardan en la caché para el siguiente GET condicional."""
+    validators = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+    return {k: v for k, v in validators.items() if v}
+
+def load_image_cache(assets_dir: str) -> dict:
+    path = os.path.join(assets_dir, CACHE_FILENAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def save_image_cache(assets_dir: str, cache: dict):
+    with open(os.path.join(assets_dir, CACHE_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)
+
+def is_cache_entry_valid(entry: dict | None, assets_dir: str) -> bool:
+    """La entrada es válida si todas sus variantes siguen en disco."""
+    if not entry:
+        return False
+    files = [v["file"] for variants in entry.get("variants", {}).values() for v in variants]
+    return bool(files) and all(os.path.exists(os.path.join(assets_dir, f)) for f in files)
+
+def build_variants(data: bytes, digest: str, assets_dir: str, formats: list[str]) -> dict | None:
+    """Genera las variantes redimensionadas de una imagen. Los archivos se nombran por hash."""
+    try:
+        img = Image.open(BytesIO(data))
+        img = ImageOps.exif_transpose(img)
+    except Exception as e:
+        print(f"⚠️  Imagen no válida ({digest[:12]}): {e}")
+        return None
+
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "P") else "RGB")
+
+    widths = sorted({min(w, img.width) for w in IMAGE_WIDTHS})
+    variants = {}
+    for fmt in formats:
+        variants[fmt] = []
+        for width in widths:
+            filename = f"{digest[:16]}-{width}.{fmt}"
+            path = os.path.join(assets_dir, filename)
+            if not os.path.exists(path):
+                height = round(img.height * width / img.width)
+                resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+                resized.save(path, fmt.upper(), quality=75)
+            variants[fmt].append({"file": filename, "width": width})
+    return {"hash": digest, "width": img.width, "height": img.height, "variants": variants}
+
+def apply_image_entry(component: dict, entry: dict, public_path: str, above_the_fold: bool):
+    """Reescribe el componente con las variantes locales y los atributos de rendimiento."""
+    content = component['content']
+    formats = [fmt for fmt in IMAGE_FORMATS if entry["variants"].get(fmt)]
+
+    def srcset_for(fmt):
+        return ", ".join(f"{public_path}/{v['file']} {v['width']}w" for v in entry["variants"][fmt])
+
+    # El formato más compatible va en el <img>; el resto como <source> del <picture>
+    fallback_fmt = formats[-1]
+    largest = entry["variants"][fallback_fmt][-1]
+    content['src'] = f"{public_path}/{largest['file']}"
+    content['width'] = largest['width']
+    content['height'] = round(entry['height'] * largest['width'] / entry['width'])
+    content['srcset'] = srcset_for(fallback_fmt)
+    content['sizes'] = DEFAULT_IMAGE_SIZES
+    content['sources'] = [{"type": IMAGE_MIME_TYPES[fmt], "srcset": srcset_for(fmt)} for fmt in formats[:-1]]
+    if above_the_fold:
+        # La primera imagen suele ser el LCP: nada de lazy y prioridad alta
+        content['loading'] = "eager"
+        content['fetchpriority'] = "high"
+    else:
+        content['loading'] = "lazy"
+
+def optimize_blueprint_images(blueprint: dict, assets_dir: str = "assets", public_path: str = "assets",
+                              base_url: str | None = None, first_above_the_fold: bool = True) -> dict:
+    """
+    Descarga, deduplica y convierte las imágenes del blueprint y reescribe sus componentes.
+    `public_path` es la ruta de `assets_dir` vista desde la página HTML generada.
+    Con `first_above_the_fold=False` ninguna imagen se trata como LCP (p. ej. bloques al pie).
+    """
+    formats = supported_formats()
+    if not formats:
+        print("⚠️  Pillow no está instalado o no soporta WebP/AVIF. Se omite la optimización de imágenes.")
+        return {"images": 0, "downloaded": 0, "cached": 0, "unique": 0}
+
+    base_url = base_url or blueprint.get('source_url', '')
+    components = [c for c in iter_image_components(blueprint.get('main_content_blueprint', []))
+                  if isinstance(c.get('content'), dict) and get_image_src(c)]
+    if not components:
+        return {"images": 0, "downloaded": 0, "cached": 0, "unique": 0}
+
+    print(f"🖼️  Optimizando {len(components)} imágenes ({', '.join(formats)})...")
+    os.makedirs(assets_dir, exist_ok=True)
+    cache = load_image_cache(assets_dir)
+
+    urls = list(dict.fromkeys(urljoin(base_url, get_image_src(c)) for c in components))
+    cached = {u: cache[u] for u in urls if is_cache_entry_valid(cache.get(u), assets_dir)}
+
+    # Descargas concurrentes con pool acotado; las imágenes ya cacheadas se revalidan
+    with ThreadPoolExecutor(max_workers=MAX_DOWNLOAD_WORKERS) as pool:
+        downloads = dict(zip(urls, pool.map(lambda u: download_image(u, cached.get(u)), urls)))
+    not_modified = [u for u, r in downloads.items() if r is not None and r.status_code == 304]
+
+    # Deduplicar por contenido: la misma imagen servida desde varias URLs se procesa una vez
+    by_hash = {entry["hash"]: {k: v for k, v in entry.items() if k not in ("etag", "last_modified")}
+               for entry in cache.values() if is_cache_entry_valid(entry, assets_dir)}
+    for url, response in downloads.items():
+        # Sin respuesta (fallo de red) o 304: se mantiene la entrada cacheada si existe
+        if response is None or response.status_code == 304:
+            continue
+        digest = hashlib.sha256(response.content).hexdigest()
+        if digest not in by_hash:
+            entry = build_variants(response.content, digest, assets_dir, formats)
+            if not entry:
+                continue
+            by_hash[digest] = entry
+        cache[url] = {**by_hash[digest], **response_validators(response)}
+
+    for index, component in enumerate(components):
+        entry = cache.get(urljoin(base_url, get_image_src(component)))
+        if entry:
+            apply_image_entry(component, entry, public_path, above_the_fold=first_above_the_fold and index == 0)
+
+    save_image_cache(assets_dir, cache)
+    stats = {"images": len(components),
+             "downloaded": len([r for r in downloads.values() if r is not None and r.status_code != 304]),
+             "cached": len(not_modified), "unique": len(by_hash)}
+    print(f"✅ Imágenes: {stats['downloaded']} descargadas, {stats['cached']} desde caché, {stats['unique']} únicas")
+    return stats
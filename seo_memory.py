@@ -0,0 +1,186 @@
+"""
+Memoria persistente de reescrituras SEO entre páginas.
+
+Los mismos títulos, CTAs y avisos legales se repiten en decenas de páginas
+de un sitio. Antes de llamar al LLM se consulta esta memoria, indexada por
+(texto normalizado, tipo de componente, keyword): las repeticiones exactas
+o casi exactas reutilizan la reescritura anterior, lo que ahorra tokens y
+mantiene una redacción coherente en todo el sitio.
+"""
+import hashlib
+import json
+import os
+import re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+SEO_MEMORY_PATH = "seo_rewrite_memory.json"
+# Similitud mínima (0-1) para reutilizar una reescritura de un texto casi idéntico
+SIMILARITY_THRESHOLD = 0.92
+MAX_SIMILARITY_CANDIDATES = 20
+# Solo textos cortos (títulos, CTAs, avisos breves) pueden reutilizarse por similitud:
+# en un párrafo largo un 8% de diferencia es contenido propio de la página
+NEAR_MATCH_MAX_CHARS = 160
+# Fuera de mayúsculas, espacios y puntuación, dos textos casi iguales solo pueden diferir
+# en estas palabras (artículos y preposiciones que no cambian el sentido)
+NEAR_MATCH_STOP_WORDS = {
+    "a", "an", "the", "of", "at", "in", "on", "to",
+    "el", "la", "los", "las", "un", "una", "unos", "unas", "lo", "de", "del", "al", "en",
+}
+# Nunca pueden ser la diferencia: invierten el sentido del texto (avisos legales, condiciones...)
+NEGATION_WORDS = {
+    "not", "no", "nor", "never", "none", "without", "cannot", "excluding", "except",
+    "sin", "ni", "nunca", "jamás", "ningún", "ninguna", "ninguno", "tampoco", "excepto", "salvo",
+}
+# Campos de texto que el Agente SEO puede reescribir
+REWRITABLE_FIELDS = ["text", "alt", "heading", "paragraph", "items"]
+
+def iter_text_components(component_list):
+    """Recorre los componentes con texto reescribible, incluidos los widgets de columnas."""
+    for component in component_list or []:
+        if not isinstance(component, dict):
+            continue
+        content = component.get('content')
+        if component.get('component_type') == "ColumnsContainer":
+            if isinstance(content, dict):
+                for col_widgets in content.get('columns', {}).values():
+                    if isinstance(col_widgets, list):
+                        yield from iter_text_components(col_widgets)
+            continue
+        if isinstance(content, dict) and any(content.get(f) for f in REWRITABLE_FIELDS):
+            yield component
+
+def extract_rewrite(component: dict) -> dict:
+    """Campos de texto reescribibles de un componente."""
+    content = component.get('content')
+    if not isinstance(content, dict):
+        return {}
+    return {f: content[f] for f in REWRITABLE_FIELDS if content.get(f)}
+
+def apply_rewrite(component: dict, rewrite: dict):
+    """Copia en el componente solo los campos de texto que ya tenía (no toca urls, src, level...)."""
+    content = component['content']
+    for field, value in rewrite.items():
+        if field in content:
+            content[field] = value
+
+def text_tokens(text: str) -> Counter:
+    """Palabras, cifras y símbolos de moneda/porcentaje de un texto normalizado."""
+    return Counter(re.findall(r'[$€£¥%]|\d[\d.,]*\d|\d|\w+', text))
+
+def is_safe_near_match(text: str, candidate_text: str) -> bool:
+    """
+    Una casi-repetición solo es reutilizable si no cambia ningún dato ni el sentido:
+    cifras, precios, plazos y porcentajes deben coincidir, y las palabras que difieren
+    deben estar en NEAR_MATCH_STOP_WORDS (nunca una negación).
+    """
+    if max(len(text), len(candidate_text)) > NEAR_MATCH_MAX_CHARS:
+        return False
+    tokens, candidate_tokens = text_tokens(text), text_tokens(candidate_text)
+    differing = (tokens - candidate_tokens) + (candidate_tokens - tokens)
+    return all(token in NEAR_MATCH_STOP_WORDS and token not in NEGATION_WORDS for token in differing)
+
+def normalize_component_text(component: dict) -> str:
+    parts = []
+    for value in extract_rewrite(component).values():
+        parts.extend(value if isinstance(value, list) else [value])
+    return re.sub(r'\s+', ' ', " ".join(str(p) for p in parts)).strip().lower()
+
+class SeoRewriteMemory:
+    """Memoria de reescrituras con búsqueda exacta y un índice invertido para casi-repeticiones."""
+
+    def __init__(self, path: str = SEO_MEMORY_PATH, threshold: float = SIMILARITY_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.entries = {}
+        self.index = defaultdict(set)
+        self.stats = Counter()
+        self.load()
+
+    @staticmethod
+    def make_key(text: str, component_type: str, keyword: str) -> str:
+        raw = f"{component_type}|{keyword.strip().lower()}|{text}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _index_entry(self, key: str, entry: dict):
+        for token in set(entry["text"].split()):
+            self.index[(entry["component_type"], entry["keyword"], token)].add(key)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️  Memoria SEO ilegible, se empieza vacía: {e}")
+            self.entries = {}
+        for key, entry in self.entries.items():
+            self._index_entry(key, entry)
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2, ensure_ascii=False)
+
+    def lookup(self, component: dict, keyword: str) -> dict | None:
+        """Devuelve la reescritura guardada para el componente, o None si no hay coincidencia."""
+        text = normalize_component_text(component)
+        component_type = component.get('component_type', '')
+        keyword = keyword.strip().lower()
+        if not text:
+            return None
+
+        entry = self.entries.get(self.make_key(text, component_type, keyword))
+        if entry:
+            self.stats["exact"] += 1
+            return entry["rewrite"]
+
+        if len(text) > NEAR_MATCH_MAX_CHARS:
+            self.stats["miss"] += 1
+            return None
+
+        # Candidatos: entradas del mismo tipo y keyword que comparten más palabras
+        shared = Counter()
+        for token in set(text.split()):
+            shared.update(self.index.get((component_type, keyword, token), ()))
+        best_entry, best_ratio = None, self.threshold
+        for key, _ in shared.most_common(MAX_SIMILARITY_CANDIDATES):
+            candidate = self.entries[key]
+            matcher = SequenceMatcher(None, text, candidate["text"])
+            if matcher.quick_ratio() < best_ratio:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= best_ratio and is_safe_near_match(text, candidate["text"]):
+                best_entry, best_ratio = candidate, ratio
+        if best_entry:
+            self.stats["near"] += 1
+            return best_entry["rewrite"]
+
+        self.stats["miss"] += 1
+        return None
+
+    def store(self, original_component: dict, keyword: str, rewrite: dict):
+        text = normalize_component_text(original_component)
+        if not text or not rewrite:
+            return
+        keyword = keyword.strip().lower()
+        entry = {
+            "text": text,
+            "component_type": original_component.get('component_type', ''),
+            "keyword": keyword,
+            "rewrite": rewrite,
+        }
+        key = self.make_key(text, entry["component_type"], keyword)
+        self.entries[key] = entry
+        self._index_entry(key, entry)
+
+    def hit_rate(self) -> float:
+        total = self.stats["exact"] + self.stats["near"] + self.stats["miss"]
+        return (self.stats["exact"] + self.stats["near"]) / total if total else 0.0
+
+    def report(self):
+        print(f"🧠 Memoria SEO: {self.stats['exact']} exactas, {self.stats['near']} similares, "
+              f"{self.stats['miss']} nuevas (hit rate {self.hit_rate():.0%})")
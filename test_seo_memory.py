@@ -0,0 +1,38 @@
+import os
+import tempfile
+
+from seo_memory import SeoRewriteMemory
+
+KEYWORD = "concesionario de autos en Pendleton OR"
+
+def paragraph(text):
+    return {"component_type": "Paragraph", "content": {"text": text}}
+
+def new_memory():
+    return SeoRewriteMemory(os.path.join(tempfile.mkdtemp(), "memoria.json"))
+
+def test_negated_disclaimer_is_not_reused():
+    memory = new_memory()
+    memory.store(paragraph("This offer is valid with other offers and incentives."), KEYWORD,
+                 {"text": "Combine this offer with other incentives."})
+    assert memory.lookup(paragraph("This offer is not valid with other offers and incentives."), KEYWORD) is None
+    memory.store(paragraph("Tax, title and license are included in the price."), KEYWORD,
+                 {"text": "Price includes tax, title and license."})
+    assert memory.lookup(paragraph("Tax, title and license are not included in the price."), KEYWORD) is None
+
+def test_different_figures_are_not_reused():
+    memory = new_memory()
+    memory.store(paragraph("Wrangler with an MSRP of $32,995 financed over 60 months."), KEYWORD, {"text": "A"})
+    assert memory.lookup(paragraph("Wrangler with an MSRP of $34,995 financed over 72 months."), KEYWORD) is None
+
+def test_punctuation_and_articles_are_reused():
+    memory = new_memory()
+    memory.store(paragraph("Schedule a test drive today"), KEYWORD, {"text": "Agenda tu prueba de manejo"})
+    assert memory.lookup(paragraph("Schedule a Test Drive today!"), KEYWORD) == {"text": "Agenda tu prueba de manejo"}
+    assert memory.lookup(paragraph("Schedule the test drive today"), KEYWORD) == {"text": "Agenda tu prueba de manejo"}
+
+if __name__ == "__main__":
+    test_negated_disclaimer_is_not_reused()
+    test_different_figures_are_not_reused()
+    test_punctuation_and_articles_are_reused()
+    print("✅ Memoria SEO: pruebas superadas")